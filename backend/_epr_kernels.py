@@ -0,0 +1,26 @@
+"""
+_epr_kernels.py
+---------------
+Numeric core of the Early-Peak Regime (EPR) update, JIT-compiled with numba
+when it is installed. Without numba the same functions run as plain Python.
+"""
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; kernels fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+
+@njit(cache=True)
+def epr_step(tick, current_mult, peak_mult, ema, alpha, tmax, ratio_thr):
+    """
+    One EPR tick: update the multiplier EMA baseline and test the peak ratio.
+    Returns (new_ema, ratio, hit) where hit means an early tick at/above ratio_thr.
+    """
+    new_ema = (1.0 - alpha) * ema + alpha * max(1.0, current_mult)
+    ratio = max(1.0, peak_mult) / max(1.0, new_ema)
+    hit = tick <= tmax and ratio >= ratio_thr
+    return new_ema, ratio, hit
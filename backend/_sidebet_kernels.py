@@ -0,0 +1,34 @@
+"""
+_sidebet_kernels.py
+-------------------
+Side-bet arithmetic shared by the signal path and its tests, JIT-compiled
+with numba when it is installed. Without numba the same functions run as
+plain Python.
+"""
+
+# numba (or its plain-Python fallback) is resolved once, in _epr_kernels
+try:
+    from _epr_kernels import njit
+except ImportError:
+    from ._epr_kernels import njit
+
+
+@njit(cache=True)
+def sidebet_ev(p_win):
+    """
+    EV per unit stake of a 5x gross side bet (net +4 on win, -1 on loss).
+    4*p - (1-p) simplifies to 5*p - 1; works on scalars and arrays alike.
+    """
+    return 5.0 * p_win - 1.0
+
+
+@njit(cache=True, fastmath=True)
+def p_win_from_hazards(h):
+    """
+    P(rug within the window) from per-tick hazards: 1 - prod(1 - h_t).
+    Equals the hazard-head CDF at the last tick of the window.
+    """
+    acc = 1.0
+    for i in range(h.shape[0]):
+        acc *= (1.0 - h[i])
+    return 1.0 - acc
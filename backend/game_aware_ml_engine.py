@@ -12,8 +12,11 @@ Keeps the same predict_rug_timing(...) signature and return dict keys.
 """
 
 from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from functools import lru_cache
 import math
 import os
+import numpy as np
 from enhanced_pattern_engine import EnhancedPatternEngine  # existing
 from ml_enhanced_engine import MLEnhancedPatternEngine    # existing
 
@@ -21,10 +24,52 @@ from hazard_head import DiscreteHazardHead
 from conformal_wrapper import ConformalPID
 from drift_detectors import SimplePageHinkley
 from ultra_short_gate import UltraShortGate
+from _epr_kernels import epr_step
+from _sidebet_kernels import sidebet_ev, p_win_from_hazards
+
+def side_bet_ev_vec(p_arr) -> np.ndarray:
+    """Side-bet EV (5*p - 1) over an array of p_win values in one numpy op"""
+    return sidebet_ev(np.asarray(p_arr, dtype=np.float64))
+
+# EPR hazard-scale curve precomputed per (scale, tau) config over dt in [0, size)
+EPR_SCALE_LUT_SIZE = 4096
+
+@lru_cache(maxsize=8)
+def _epr_scale_lut(haz_scale: float, haz_tau: int) -> np.ndarray:
+    dts = np.arange(EPR_SCALE_LUT_SIZE, dtype=np.float64)
+    lut = haz_scale + (1.0 - haz_scale) * np.exp(-dts / max(1, haz_tau))
+    lut.setflags(write=False)
+    return lut
+
+@dataclass(frozen=True)
+class EPRConfig:
+    """Early-Peak Regime settings, parsed from EPR_* env vars once and shared by reference"""
+    tmax: int = 120            # EPR_EARLY_TICK_MAX
+    ratio_thr: float = 3.0     # EPR_RATIO_THRESHOLD
+    sustain_min: int = 10      # EPR_MIN_SUSTAIN_TICKS
+    ema_alpha: float = 0.1     # EPR_BASELINE_EMA_ALPHA
+    haz_scale: float = 0.75    # EPR_HAZARD_SCALE
+    haz_tau: int = 120         # EPR_HAZARD_DECAY_TAU
+    spread_wide: int = 160     # EPR_SPREAD_WIDE
+    q_wide: float = 0.7        # EPR_QUANTILE_WIDE_SPREAD
+
+    @classmethod
+    def from_env(cls) -> "EPRConfig":
+        return cls(
+            tmax=int(os.getenv("EPR_EARLY_TICK_MAX", "120")),
+            ratio_thr=float(os.getenv("EPR_RATIO_THRESHOLD", "3.0")),
+            sustain_min=int(os.getenv("EPR_MIN_SUSTAIN_TICKS", "10")),
+            ema_alpha=float(os.getenv("EPR_BASELINE_EMA_ALPHA", "0.1")),
+            haz_scale=float(os.getenv("EPR_HAZARD_SCALE", "0.75")),
+            haz_tau=int(os.getenv("EPR_HAZARD_DECAY_TAU", "120")),
+            spread_wide=int(os.getenv("EPR_SPREAD_WIDE", "160")),
+            q_wide=float(os.getenv("EPR_QUANTILE_WIDE_SPREAD", "0.7")),
+        )
 
 class GameAwareMLPatternEngine(MLEnhancedPatternEngine):
-    def __init__(self, base_pattern_engine: EnhancedPatternEngine, *, enable_hazard: bool = True, enable_gate: bool = True, enable_conformal: bool = True):
+    def __init__(self, base_pattern_engine: EnhancedPatternEngine, *, enable_hazard: bool = True, enable_gate: bool = True, enable_conformal: bool = True, epr_cfg: Optional[EPRConfig] = None):
         super().__init__(base_pattern_engine)
+        self.epr_cfg = epr_cfg if epr_cfg is not None else EPRConfig.from_env()
         self.hazard = DiscreteHazardHead()
         self.conformal = ConformalPID(target=0.85)
         self.ph = SimplePageHinkley()
@@ -38,21 +83,14 @@ class GameAwareMLPatternEngine(MLEnhancedPatternEngine):
         
     # -------- EPR: Early Peak Regime --------
     def _init_epr(self):
+        if getattr(self, "epr_cfg", None) is None:
+            self.epr_cfg = EPRConfig.from_env()
         self._epr = {
             "active": False,
             "first_hit_tick": None,
             "ema": 1.0,
             "sustain_ticks": 0,
-            "cfg": {
-                "tmax": int(os.getenv("EPR_EARLY_TICK_MAX", "120")),
-                "ratio_thr": float(os.getenv("EPR_RATIO_THRESHOLD", "3.0")),
-                "sustain_min": int(os.getenv("EPR_MIN_SUSTAIN_TICKS", "10")),
-                "ema_alpha": float(os.getenv("EPR_BASELINE_EMA_ALPHA", "0.1")),
-                "haz_scale": float(os.getenv("EPR_HAZARD_SCALE", "0.75")),
-                "haz_tau": int(os.getenv("EPR_HAZARD_DECAY_TAU", "120")),
-                "spread_wide": int(os.getenv("EPR_SPREAD_WIDE", "160")),
-                "q_wide": float(os.getenv("EPR_QUANTILE_WIDE_SPREAD", "0.7")),
-            }
+            "cfg": self.epr_cfg,
         }
 
     def _update_epr(self, tick: int, current_mult: float, peak_mult: float):
@@ -60,12 +98,14 @@ class GameAwareMLPatternEngine(MLEnhancedPatternEngine):
             self._init_epr()
         epr = self._epr
         cfg = epr["cfg"]
-        # EMA baseline of multiplier (≥1.0)
-        epr["ema"] = (1 - cfg["ema_alpha"]) * epr["ema"] + cfg["ema_alpha"] * max(1.0, current_mult or 1.0)
-        ratio = max(1.0, (peak_mult or 1.0)) / max(1.0, epr["ema"])
-        if tick <= cfg["tmax"] and ratio >= cfg["ratio_thr"]:
+        # EMA baseline of multiplier (≥1.0) and peak ratio test (JIT kernel)
+        epr["ema"], ratio, hit = epr_step(
+            int(tick), float(current_mult or 1.0), float(peak_mult or 1.0),
+            float(epr["ema"]), float(cfg.ema_alpha), int(cfg.tmax), float(cfg.ratio_thr),
+        )
+        if hit:
             epr["sustain_ticks"] += 1
-            if not epr["active"] and epr["sustain_ticks"] >= cfg["sustain_min"]:
+            if not epr["active"] and epr["sustain_ticks"] >= cfg.sustain_min:
                 epr["active"] = True
                 epr["first_hit_tick"] = tick
         else:
@@ -80,8 +120,10 @@ class GameAwareMLPatternEngine(MLEnhancedPatternEngine):
         if not epr["active"] or epr["first_hit_tick"] is None:
             return 1.0
         dt = max(0, tick - epr["first_hit_tick"])
-        # scale in (0,1], decays toward 1.0 as dt grows
-        return cfg["haz_scale"] + (1.0 - cfg["haz_scale"]) * math.exp(-dt / max(1, cfg["haz_tau"]))
+        # scale in (0,1], decays toward haz_scale as dt grows; table lookup for realistic dt
+        if dt < EPR_SCALE_LUT_SIZE:
+            return float(_epr_scale_lut(cfg.haz_scale, cfg.haz_tau)[dt])
+        return cfg.haz_scale + (1.0 - cfg.haz_scale) * math.exp(-dt / max(1, cfg.haz_tau))
     
     def register_stream_scale(self, scale: float):
         """Register hazard scale from tick feature engine"""
@@ -193,8 +235,8 @@ class GameAwareMLPatternEngine(MLEnhancedPatternEngine):
                     qt = max(0.3, min(0.8, qt))  # Bound between 0.3 and 0.8
             
             # Override with higher quantile when spread is wide or EPR is active
-            if spread > self._epr["cfg"]["spread_wide"] or self._epr["active"]:
-                qt = max(qt, self._epr["cfg"]["q_wide"])  # e.g., 0.7
+            if spread > self._epr["cfg"].spread_wide or self._epr["active"]:
+                qt = max(qt, self._epr["cfg"].q_wide)  # e.g., 0.7
             
             # Get the appropriate quantile
             q_key = f"q{int(qt*100)}"
@@ -279,11 +321,12 @@ class GameAwareMLPatternEngine(MLEnhancedPatternEngine):
         if peak_price >= 10.0:
             thr = thr + 0.03  # Additional +0.03 for extreme peaks (total +0.05 if EPR also active)
 
-        hz = self.hazard.fold_stream(self._build_hazard_logits(horizon=window))
-        cdf = hz.get("cdf", [])
-        # P(win in next window) = CDF[window-1]
-        p_win = cdf[window - 1] if len(cdf) >= window else (cdf[-1] if cdf else 0.0)
-        ev = 4.0 * p_win - (1.0 - p_win)
+        # P(win in next window) = CDF[window-1] = 1 - prod(1 - h_t); only the window
+        # end is needed, so skip the full fold and integrate hazards in the kernel
+        logits = np.asarray(self._build_hazard_logits(horizon=window), dtype=np.float64)
+        hazards = np.exp(-np.logaddexp(0.0, -logits))  # stable sigmoid
+        p_win = float(p_win_from_hazards(hazards))
+        ev = float(sidebet_ev(np.float64(p_win)))
         action = "PLACE_SIDE_BET" if p_win > thr else "WAIT"
 
         signal = {
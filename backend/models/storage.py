@@ -3,9 +3,9 @@ Pydantic models for persistent storage in MongoDB.
 These models define the schema for game data, predictions, and metrics.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from enum import Enum
 
 
@@ -23,6 +23,11 @@ class SideBetOutcome(str, Enum):
     PENDING = "PENDING"
 
 
+# Resolved (outcome, payout) pairs: 5x payout on a win, stake lost otherwise
+_SIDE_BET_WON = (SideBetOutcome.WON, 5.0)
+_SIDE_BET_LOST = (SideBetOutcome.LOST, -1.0)
+
+
 class GameRecord(BaseModel):
     """Complete game record for MongoDB storage"""
     game_id: str
@@ -39,11 +44,6 @@ class GameRecord(BaseModel):
     side_bets_placed: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class PredictionRecord(BaseModel):
@@ -75,11 +75,6 @@ class PredictionRecord(BaseModel):
             "within_windows": within_windows,
             "absolute_error": abs(raw_error)
         }
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class SideBetRecord(BaseModel):
@@ -95,19 +90,15 @@ class SideBetRecord(BaseModel):
     payout: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
+    @staticmethod
+    def resolve_outcome(window_end_tick: int, game_end_tick: int) -> Tuple[SideBetOutcome, float]:
+        """(outcome, payout) for a bet window; usable on raw documents without building a model"""
+        return _SIDE_BET_WON if game_end_tick <= window_end_tick else _SIDE_BET_LOST
+    
     def calculate_payout(self, game_end_tick: int) -> float:
         """Calculate payout based on game outcome"""
-        if game_end_tick <= self.window_end_tick:
-            self.actual_outcome = SideBetOutcome.WON
-            return 5.0  # 5x payout
-        else:
-            self.actual_outcome = SideBetOutcome.LOST
-            return -1.0  # Lost bet
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+        self.actual_outcome, payout = self.resolve_outcome(self.window_end_tick, game_end_tick)
+        return payout
 
 
 class HourlyMetrics(BaseModel):
@@ -150,11 +141,6 @@ class HourlyMetrics(BaseModel):
     )
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class TickSample(BaseModel):
@@ -166,10 +152,60 @@ class TickSample(BaseModel):
     timestamp: datetime
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+
+class TickChunk(BaseModel):
+    """
+    Columnar run of consecutive tick samples for one game.
+    Stores each field once per chunk instead of once per tick; a feature
+    missing at a tick is stored as None and dropped again by to_samples(),
+    so genuine NaN values round-trip unchanged.
+    """
+    game_id: str
+    start_tick: int
+    end_tick: int
+    ticks: List[int]
+    prices: List[float]
+    features: Dict[str, List[Optional[float]]] = Field(default_factory=dict)
+    timestamps: List[datetime]
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    @classmethod
+    def from_samples(cls, samples: List[TickSample]) -> "TickChunk":
+        """Pack samples of a single game (in tick order) into one chunk"""
+        names = sorted({name for sample in samples for name in sample.features})
+        return cls(
+            game_id=samples[0].game_id,
+            start_tick=samples[0].tick,
+            end_tick=samples[-1].tick,
+            ticks=[sample.tick for sample in samples],
+            prices=[sample.price for sample in samples],
+            features={
+                name: [sample.features.get(name) for sample in samples]
+                for name in names
+            },
+            timestamps=[sample.timestamp for sample in samples]
+        )
+    
+    def to_samples(self) -> List[TickSample]:
+        """Unpack the chunk back into per-tick samples"""
+        return [
+            TickSample(
+                game_id=self.game_id,
+                tick=tick,
+                price=self.prices[i],
+                features={
+                    name: values[i] for name, values in self.features.items()
+                    if values[i] is not None
+                },
+                timestamp=self.timestamps[i],
+                created_at=self.created_at
+            )
+            for i, tick in enumerate(self.ticks)
+        ]
+    
+    model_config = ConfigDict(frozen=True)
 
 
 class PersistenceStatus(BaseModel):
@@ -180,8 +216,3 @@ class PersistenceStatus(BaseModel):
     records_saved_total: int = 0
     last_error: Optional[str] = None
     error_count: int = 0
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat() if v else None
-        }
\ No newline at end of file
@@ -5,34 +5,138 @@ Provides safe rollback via PERSISTENCE_ENABLED environment variable.
 """
 
 import os
+import asyncio
 import logging
-from typing import Optional, TYPE_CHECKING
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, TYPE_CHECKING
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from fastapi import HTTPException
 
 try:
-    from repositories.game_repository import GameRepository
+    from repositories.game_repository import GameRepository, UnitOfWork, TICK_CHUNK_SIZE
     from tasks.persistence_manager import PersistenceManager
-    from models.storage import GameRecord, PredictionRecord, SideBetRecord
+    from models.storage import GameRecord, PredictionRecord, SideBetRecord, TickSample
 except ImportError:
     # Handle both relative and absolute imports
     try:
-        from .repositories.game_repository import GameRepository
+        from .repositories.game_repository import GameRepository, UnitOfWork, TICK_CHUNK_SIZE
         from .tasks.persistence_manager import PersistenceManager
-        from .models.storage import GameRecord, PredictionRecord, SideBetRecord
+        from .models.storage import GameRecord, PredictionRecord, SideBetRecord, TickSample
     except ImportError:
         import sys
         from pathlib import Path
         sys.path.insert(0, str(Path(__file__).parent))
-        from repositories.game_repository import GameRepository
+        from repositories.game_repository import GameRepository, UnitOfWork, TICK_CHUNK_SIZE
         from tasks.persistence_manager import PersistenceManager
-        from models.storage import GameRecord, PredictionRecord, SideBetRecord
+        from models.storage import GameRecord, PredictionRecord, SideBetRecord, TickSample
 
 if TYPE_CHECKING:
     from server import IntegratedPatternTracker
 
 logger = logging.getLogger(__name__)
 
+# Process-wide Motor client, created on first use by get_client()
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def get_client(mongo_url: Optional[str] = None) -> AsyncIOMotorClient:
+    """
+    Shared Motor client for the whole process.
+    One pool serves every repository, so concurrent bulk writes across
+    collections run on separate sockets instead of queueing per client.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            mongo_url or os.environ["MONGO_URL"],
+            maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+            minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "5")),
+            waitQueueTimeoutMS=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+        )
+    return _client
+
+
+class TickSampleBatcher:
+    """
+    Coalesces per-tick samples into bulk writes.
+    Flushes once max_batch samples are buffered, or max_delay_ms after the
+    first sample of a batch arrives, whichever comes first. Batches are stored
+    as columnar tick chunks unless columnar=False.
+    
+    In columnar mode each game keeps one open chunk that is only queued for
+    writing once it holds chunk_size ticks or the game ends, so stored chunks
+    are full-sized. Games run one at a time, so the first tick of a new game
+    also closes any chunk left open by a game whose end was never reported.
+    """
+    
+    def __init__(self, repo: GameRepository, max_batch: int = 500, max_delay_ms: int = 250,
+                 columnar: bool = True, chunk_size: int = TICK_CHUNK_SIZE):
+        self.repo = repo
+        self.max_batch = max_batch
+        self.columnar = columnar
+        self.chunk_size = chunk_size
+        self.max_delay = max_delay_ms / 1000.0
+        self._buf: List[TickSample] = []
+        self._open: Dict[str, List[TickSample]] = {}
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    async def add(self, sample: TickSample):
+        """Buffer a sample, flushing immediately when the batch is full"""
+        if self.columnar:
+            if self._open and sample.game_id not in self._open:
+                self._close_open_chunks()
+            chunk = self._open.setdefault(sample.game_id, [])
+            chunk.append(sample)
+            if len(chunk) >= self.chunk_size:
+                self._buf.extend(self._open.pop(sample.game_id))
+            if not self._buf:
+                return
+        else:
+            self._buf.append(sample)
+        
+        if len(self._buf) >= self.max_batch:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+    
+    async def _delayed_flush(self):
+        try:
+            await asyncio.sleep(self.max_delay)
+        except asyncio.CancelledError:
+            return
+        # Shielded so cancelling the timer never drops a batch mid-write
+        await asyncio.shield(self.flush())
+    
+    async def flush(self) -> int:
+        """Write everything buffered so far; the lock keeps batches from being submitted twice"""
+        async with self._lock:
+            batch, self._buf = self._buf, []
+            if not batch:
+                return 0
+            if self.columnar:
+                return await self.repo.save_tick_chunks(batch, self.chunk_size)
+            return await self.repo.save_tick_samples_batch(batch)
+    
+    async def end_game(self, game_id: str) -> int:
+        """Close the game's open chunk, partial or not, and write it out"""
+        self._buf.extend(self._open.pop(game_id, []))
+        return await self.flush()
+    
+    def _close_open_chunks(self):
+        """Queue every open chunk for the next flush"""
+        for chunk in self._open.values():
+            self._buf.extend(chunk)
+        self._open.clear()
+    
+    async def close(self):
+        """Cancel the pending timer and flush what is left, open chunks included"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._close_open_chunks()
+        await self.flush()
+
 
 class PersistenceIntegration:
     """
@@ -40,23 +144,34 @@ class PersistenceIntegration:
     Wraps all persistence functionality with safe fallback.
     """
     
-    def __init__(self, db: AsyncIOMotorDatabase, tracker: Optional['IntegratedPatternTracker'] = None):
+    def __init__(self, db: AsyncIOMotorDatabase, tracker: Optional['IntegratedPatternTracker'] = None,
+                 enabled: Optional[bool] = None):
         """
         Initialize persistence integration.
         
         Args:
             db: MongoDB database connection
             tracker: IntegratedPatternTracker instance (can be set later)
+            enabled: Override for the PERSISTENCE_ENABLED environment flag
         """
-        self.enabled = os.getenv("PERSISTENCE_ENABLED", "false").lower() == "true"
+        if enabled is None:
+            enabled = os.getenv("PERSISTENCE_ENABLED", "false").lower() == "true"
+        self.enabled = enabled
+        # Persist every Nth tick (default keeps the 1-in-10 sampling cadence)
+        self.tick_sample_every = max(1, int(os.getenv("PERSISTENCE_TICK_SAMPLE_EVERY", "10")))
         self.db = db
         self.tracker = tracker
         self.repo = None
         self.manager = None
+        self.tick_batcher = None
+        self._pool = None
         
         if self.enabled:
             logger.info("Initializing persistence integration...")
-            self.repo = GameRepository(db)
+            self.repo = GameRepository(db, enabled=True)
+            self.tick_batcher = TickSampleBatcher(self.repo)
+            # Record building at game end is CPU-bound; keep it off the event loop
+            self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="persistence")
             if tracker:
                 self.manager = PersistenceManager(tracker, self.repo)
         else:
@@ -76,6 +191,10 @@ class PersistenceIntegration:
     
     async def stop(self):
         """Stop persistence background tasks"""
+        if self.tick_batcher:
+            await self.tick_batcher.close()
+        if self._pool:
+            self._pool.shutdown(wait=False)
         if self.enabled and self.manager:
             await self.manager.stop()
             logger.info("Persistence background tasks stopped")
@@ -115,6 +234,26 @@ class PersistenceIntegration:
         except Exception as e:
             logger.error(f"Error updating game peak: {e}")
     
+    async def on_tick(self, game_id: str, tick: int, price: float, features: Optional[dict] = None):
+        """
+        Called on every game tick; every tick_sample_every-th tick is buffered
+        and written in bulk, the rest are dropped.
+        """
+        if not self.enabled or not self.tick_batcher or tick % self.tick_sample_every:
+            return
+        
+        try:
+            sample = TickSample(
+                game_id=game_id,
+                tick=tick,
+                price=price,
+                features=features or {},
+                timestamp=datetime.utcnow()
+            )
+            await self.tick_batcher.add(sample)
+        except Exception as e:
+            logger.error(f"Error buffering tick sample: {e}")
+    
     async def on_game_end(self, game_id: str, end_tick: int, final_price: float, 
                          treasury_remainder: Optional[int] = None):
         """Called when a game ends"""
@@ -122,19 +261,54 @@ class PersistenceIntegration:
             return
         
         try:
-            # Update game end
-            await self.repo.update_game_end(game_id, end_tick, final_price, treasury_remainder)
+            if self.tick_batcher:
+                await self.tick_batcher.end_game(game_id)
             
-            # Update predictions
-            await self.repo.update_prediction_outcome(game_id, end_tick)
+            # Reads are independent and stay on the loop
+            game, side_bets = await asyncio.gather(
+                self.repo.games.find_one({"game_id": game_id}),
+                self.repo.find_pending_side_bets(game_id)
+            )
             
-            # Update side bets
-            await self.repo.update_side_bet_outcomes(game_id, end_tick)
+            # Build the outcome records in the pool so WS broadcasts keep flowing
+            loop = asyncio.get_running_loop()
+            uow = await loop.run_in_executor(
+                self._pool, self._build_records, game_id, end_tick, final_price,
+                treasury_remainder, game, side_bets
+            )
+            
+            # Predictions (one per tick) are paged in batch_size reads; the
+            # queue is committed whenever it grows past a batch so memory
+            # stays bounded on long games
+            total = within_2_windows = 0
+            async for predictions in self.repo.iter_pending_predictions(game_id):
+                total += len(predictions)
+                within_2_windows += await loop.run_in_executor(
+                    self._pool, self.repo.queue_prediction_outcomes, uow, predictions, end_tick
+                )
+                if uow.pending >= self.repo.batch_size:
+                    await uow.commit()
+            self.repo.queue_prediction_accuracy(uow, game_id, total, within_2_windows)
+            
+            # One bulk_write per collection
+            await uow.commit()
             
             logger.debug(f"Persisted game end: {game_id} at tick {end_tick}")
         except Exception as e:
             logger.error(f"Error persisting game end: {e}")
     
+    def _build_records(self, game_id: str, end_tick: int, final_price: float,
+                       treasury_remainder: Optional[int], game: Optional[Dict],
+                       side_bets: List[Dict]) -> UnitOfWork:
+        """Build the game and side bet end-of-game writes; runs in the worker pool"""
+        uow = UnitOfWork(self.repo)
+        if game:
+            self.repo.queue_game_end(uow, game, end_tick, final_price, treasury_remainder)
+        else:
+            logger.warning(f"Game {game_id} not found for end update")
+        self.repo.queue_side_bet_outcomes(uow, side_bets, end_tick)
+        return uow
+    
     async def on_prediction_made(self, game_id: str, predicted_at_tick: int, 
                                 predicted_end_tick: int, confidence: float,
                                 uncertainty_bounds: dict, features: dict):
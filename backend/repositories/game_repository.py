@@ -4,23 +4,38 @@ Implements safe persistence with feature flag for easy rollback.
 """
 
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional, Dict, Any
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import AsyncIterator, List, Optional, Dict, Any, Union
 from datetime import datetime, timedelta
+import asyncio
 import logging
 import os
 try:
     from ..models.storage import (
         GameRecord, PredictionRecord, SideBetRecord, 
-        HourlyMetrics, TickSample, PersistenceStatus
+        HourlyMetrics, TickSample, TickChunk, PersistenceStatus
     )
 except ImportError:
     from models.storage import (
         GameRecord, PredictionRecord, SideBetRecord, 
-        HourlyMetrics, TickSample, PersistenceStatus
+        HourlyMetrics, TickSample, TickChunk, PersistenceStatus
     )
 
 logger = logging.getLogger(__name__)
 
+# Name of the created_at TTL index that lets MongoDB expire old documents
+TTL_INDEX_NAME = "created_at_ttl"
+
+# Span of created_at covered by each delete_many in the retention fallback
+CLEANUP_CHUNK = timedelta(days=1)
+
+# MongoDB duplicate key error code (E11000)
+DUPLICATE_KEY_ERROR = 11000
+
+# Ticks packed into each columnar tick_chunks document
+TICK_CHUNK_SIZE = 256
+
 
 class GameRepository:
     """
@@ -28,16 +43,19 @@ class GameRepository:
     Can be disabled via PERSISTENCE_ENABLED flag for safe rollback.
     """
     
-    def __init__(self, db: AsyncIOMotorDatabase):
+    def __init__(self, db: AsyncIOMotorDatabase, enabled: Optional[bool] = None):
         self.db = db
         self.games = db.games
         self.predictions = db.predictions
         self.side_bets = db.side_bets
         self.metrics = db.metrics_hourly
         self.tick_samples = db.tick_samples
+        self.tick_chunks = db.tick_chunks
         
-        # Feature flag for safe rollback
-        self.persistence_enabled = os.getenv("PERSISTENCE_ENABLED", "false").lower() == "true"
+        # Feature flag for safe rollback (explicit argument overrides the environment)
+        if enabled is None:
+            enabled = os.getenv("PERSISTENCE_ENABLED", "false").lower() == "true"
+        self.persistence_enabled = enabled
         
         # Batch settings
         self.batch_size = int(os.getenv("PERSISTENCE_BATCH_SIZE", "100"))
@@ -65,17 +83,23 @@ class GameRepository:
                 ("had_predictions", 1)
             ])
             
-            # Predictions collection indexes
-            await self.predictions.create_index("game_id")
+            # Predictions collection indexes (game_id lookups use the
+            # leftmost prefix of the compound indexes)
             await self.predictions.create_index([("created_at", -1)])
             await self.predictions.create_index([
                 ("game_id", 1), 
                 ("predicted_at_tick", 1)
             ])
+            # Partial, so only predictions still awaiting an outcome are
+            # indexed; matches the pending filter in _pending_predictions_cursor
+            await self.predictions.create_index([
+                ("game_id", 1), 
+                ("actual_end_tick", 1)
+            ], name="game_pending", partialFilterExpression={"actual_end_tick": None})
             await self.predictions.create_index("error_metrics.e40")
             
-            # Side bets collection indexes
-            await self.side_bets.create_index("game_id")
+            # Side bets collection indexes (game_id lookups use the
+            # leftmost prefix of the compound index)
             await self.side_bets.create_index([("created_at", -1)])
             await self.side_bets.create_index([
                 ("game_id", 1), 
@@ -97,6 +121,13 @@ class GameRepository:
             ], unique=True)
             await self.tick_samples.create_index([("created_at", -1)])
             
+            # Tick chunk indexes (tick-range lookups per game; unique so a
+            # retried flush cannot store the same chunk twice)
+            await self.tick_chunks.create_index([
+                ("game_id", 1),
+                ("start_tick", 1)
+            ], unique=True)
+            
             logger.info("All database indexes created successfully")
             return True
             
@@ -106,6 +137,49 @@ class GameRepository:
             self.status.error_count += 1
             return False
     
+    async def ensure_ttl_indexes(self, retention_days: Dict[str, int]) -> Dict[str, int]:
+        """
+        Create TTL indexes on created_at so MongoDB expires old documents in
+        the background. Existing TTL indexes are re-tuned via collMod when the
+        retention policy changes. Returns expireAfterSeconds per collection.
+        """
+        if not self.persistence_enabled:
+            return {}
+        
+        configured = {}
+        for name, days in retention_days.items():
+            collection = getattr(self, name)
+            expire_after = int(days * 86400)
+            try:
+                existing = (await collection.index_information()).get(TTL_INDEX_NAME)
+                if existing is None:
+                    await collection.create_index(
+                        [("created_at", 1)],
+                        name=TTL_INDEX_NAME,
+                        expireAfterSeconds=expire_after
+                    )
+                elif existing.get("expireAfterSeconds") != expire_after:
+                    await self.db.command(
+                        "collMod", collection.name,
+                        index={"name": TTL_INDEX_NAME, "expireAfterSeconds": expire_after}
+                    )
+                configured[name] = expire_after
+            except Exception as e:
+                logger.error(f"Error creating TTL index on {name}: {e}")
+                self.status.last_error = str(e)
+                self.status.error_count += 1
+        
+        logger.info(f"TTL indexes configured: {configured}")
+        return configured
+    
+    async def _has_ttl_index(self, name: str) -> bool:
+        """Check whether a collection is already expired by its TTL index"""
+        try:
+            info = await getattr(self, name).index_information()
+        except Exception:
+            return False
+        return "expireAfterSeconds" in info.get(TTL_INDEX_NAME, {})
+    
     # Game Operations
     
     async def save_game(self, game: GameRecord) -> Optional[str]:
@@ -114,10 +188,13 @@ class GameRepository:
             return None
             
         try:
-            game.updated_at = datetime.utcnow()
+            # updated_at is stamped server-side to avoid client clock skew
             result = await self.games.update_one(
                 {"game_id": game.game_id},
-                {"$set": game.dict()},
+                {
+                    "$set": game.model_dump(exclude={"updated_at"}),
+                    "$currentDate": {"updated_at": True}
+                },
                 upsert=True
             )
             
@@ -144,8 +221,9 @@ class GameRepository:
             return None
     
     async def update_game_end(self, game_id: str, end_tick: int, 
-                             final_price: float, treasury_remainder: Optional[int] = None):
-        """Update game with ending information"""
+                             final_price: float, treasury_remainder: Optional[int] = None,
+                             uow: Optional["UnitOfWork"] = None):
+        """Update game with ending information (queued on uow when given)"""
         if not self.persistence_enabled:
             return
             
@@ -156,22 +234,35 @@ class GameRepository:
                 logger.warning(f"Game {game_id} not found for end update")
                 return
             
-            duration = end_tick - game["start_tick"]
-            
-            await self.games.update_one(
-                {"game_id": game_id},
-                {"$set": {
-                    "end_tick": end_tick,
-                    "duration_ticks": duration,
-                    "final_price": final_price,
-                    "treasury_remainder": treasury_remainder,
-                    "updated_at": datetime.utcnow()
-                }}
-            )
+            if uow is not None:
+                self.queue_game_end(uow, game, end_tick, final_price, treasury_remainder)
+            else:
+                await self.games.update_one(
+                    *self._game_end_update(game, end_tick, final_price, treasury_remainder)
+                )
             
         except Exception as e:
             logger.error(f"Error updating game end for {game_id}: {e}")
     
+    @staticmethod
+    def _game_end_update(game: Dict, end_tick: int, final_price: float,
+                         treasury_remainder: Optional[int]):
+        """Build the (filter, update) pair closing out a game document"""
+        return (
+            {"game_id": game["game_id"]},
+            {"$set": {
+                "end_tick": end_tick,
+                "duration_ticks": end_tick - game["start_tick"],
+                "final_price": final_price,
+                "treasury_remainder": treasury_remainder
+            }, "$currentDate": {"updated_at": True}}
+        )
+    
+    def queue_game_end(self, uow: "UnitOfWork", game: Dict, end_tick: int,
+                       final_price: float, treasury_remainder: Optional[int] = None):
+        """Queue the game end update for a fetched game document"""
+        uow.queue("games", UpdateOne(*self._game_end_update(game, end_tick, final_price, treasury_remainder)))
+    
     # Prediction Operations
     
     async def save_prediction(self, prediction: PredictionRecord) -> Optional[str]:
@@ -180,7 +271,7 @@ class GameRepository:
             return None
             
         try:
-            result = await self.predictions.insert_one(prediction.dict())
+            result = await self.predictions.insert_one(prediction.model_dump())
             
             # Update game to indicate it has predictions
             await self.games.update_one(
@@ -197,47 +288,90 @@ class GameRepository:
             self.status.error_count += 1
             return None
     
-    async def update_prediction_outcome(self, game_id: str, actual_tick: int):
-        """Update all predictions for a game with actual outcome"""
+    @staticmethod
+    def _prediction_outcome_op(pred_doc: Dict, actual_tick: int) -> UpdateOne:
+        """Build the outcome update for one pending prediction document"""
+        return UpdateOne(
+            {"_id": pred_doc["_id"]},
+            {"$set": {
+                "actual_end_tick": actual_tick,
+                "error_metrics": PredictionRecord(**pred_doc).calculate_error_metrics(actual_tick)
+            }}
+        )
+    
+    def _pending_predictions_cursor(self, game_id: str):
+        """Cursor over all predictions for a game without outcomes"""
+        return self.predictions.find({
+            "game_id": game_id,
+            "actual_end_tick": None
+        })
+    
+    @staticmethod
+    def _within_2_windows(predictions: List[Dict], actual_tick: int) -> int:
+        """Count predictions that landed within two 40-tick windows of the outcome"""
+        return sum(1 for p in predictions if abs(p["predicted_end_tick"] - actual_tick) <= 80)
+    
+    async def iter_pending_predictions(self, game_id: str) -> AsyncIterator[List[Dict]]:
+        """Yield a game's predictions without outcomes in lists of at most batch_size"""
+        batch = []
+        async for pred_doc in self._pending_predictions_cursor(game_id).batch_size(self.batch_size):
+            batch.append(pred_doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def queue_prediction_outcomes(self, uow: "UnitOfWork", predictions: List[Dict],
+                                  actual_tick: int) -> int:
+        """
+        Queue outcome updates for a batch of fetched predictions.
+        Returns how many landed within two windows, for queue_prediction_accuracy.
+        """
+        for pred_doc in predictions:
+            uow.queue("predictions", self._prediction_outcome_op(pred_doc, actual_tick))
+        return self._within_2_windows(predictions, actual_tick)
+    
+    def queue_prediction_accuracy(self, uow: "UnitOfWork", game_id: str,
+                                  total: int, within_2_windows: int):
+        """Queue the game's prediction accuracy over all resolved predictions"""
+        if total:
+            uow.queue("games", UpdateOne(
+                {"game_id": game_id},
+                {"$set": {"prediction_accuracy": within_2_windows / total}}
+            ))
+    
+    async def update_prediction_outcome(self, game_id: str, actual_tick: int,
+                                        uow: Optional["UnitOfWork"] = None):
+        """
+        Update all predictions for a game with actual outcome.
+        Pending predictions are read in pages of batch_size. With a uow the
+        updates are queued for its commit; otherwise each page is written as
+        soon as it is read.
+        """
         if not self.persistence_enabled:
             return
             
         try:
-            # Find all predictions for this game without outcomes
-            cursor = self.predictions.find({
-                "game_id": game_id,
-                "actual_end_tick": None
-            })
-            
-            predictions = await cursor.to_list(None)
-            
-            for pred_doc in predictions:
-                # Create PredictionRecord from document
-                pred = PredictionRecord(**pred_doc)
-                
-                # Calculate error metrics
-                error_metrics = pred.calculate_error_metrics(actual_tick)
+            total = within_2_windows = 0
+            # Stream instead of to_list so reads stay O(batch_size)
+            async for predictions in self.iter_pending_predictions(game_id):
+                total += len(predictions)
+                if uow is not None:
+                    within_2_windows += self.queue_prediction_outcomes(uow, predictions, actual_tick)
+                    continue
                 
-                # Update prediction with outcome
-                await self.predictions.update_one(
-                    {"_id": pred_doc["_id"]},
-                    {"$set": {
-                        "actual_end_tick": actual_tick,
-                        "error_metrics": error_metrics
-                    }}
-                )
+                operations = [self._prediction_outcome_op(p, actual_tick) for p in predictions]
+                within_2_windows += self._within_2_windows(predictions, actual_tick)
+                await self.predictions.bulk_write(operations, ordered=False)
             
             # Update game with prediction accuracy
-            if predictions:
-                within_2_windows = sum(
-                    1 for p in predictions 
-                    if abs(p["predicted_end_tick"] - actual_tick) <= 80
-                )
-                accuracy = within_2_windows / len(predictions) if predictions else 0
-                
+            if uow is not None:
+                self.queue_prediction_accuracy(uow, game_id, total, within_2_windows)
+            elif total:
                 await self.games.update_one(
                     {"game_id": game_id},
-                    {"$set": {"prediction_accuracy": accuracy}}
+                    {"$set": {"prediction_accuracy": within_2_windows / total}}
                 )
                 
         except Exception as e:
@@ -268,7 +402,7 @@ class GameRepository:
             return None
             
         try:
-            result = await self.side_bets.insert_one(side_bet.dict())
+            result = await self.side_bets.insert_one(side_bet.model_dump())
             
             # Increment side bet counter for game
             await self.games.update_one(
@@ -285,30 +419,49 @@ class GameRepository:
             self.status.error_count += 1
             return None
     
-    async def update_side_bet_outcomes(self, game_id: str, game_end_tick: int):
-        """Update all side bets for a game with outcomes"""
+    async def find_pending_side_bets(self, game_id: str) -> List[Dict]:
+        """
+        Find all side bets for a game still awaiting an outcome.
+        Read in one to_list: recommendations are spaced by the window plus
+        cooldown, so a game only ever has a handful of bets.
+        """
+        cursor = self.side_bets.find({
+            "game_id": game_id,
+            "actual_outcome": "PENDING"
+        })
+        return await cursor.to_list(None)
+    
+    def queue_side_bet_outcomes(self, uow: "UnitOfWork", side_bets: List[Dict], game_end_tick: int):
+        """Queue outcome and payout updates for fetched side bets"""
+        resolve = SideBetRecord.resolve_outcome
+        for bet_doc in side_bets:
+            # Resolve straight from the stored window; no model validation per bet
+            outcome, payout = resolve(bet_doc["window_end_tick"], game_end_tick)
+            
+            uow.queue("side_bets", UpdateOne(
+                {"_id": bet_doc["_id"]},
+                {"$set": {
+                    "actual_outcome": outcome.value,
+                    "payout": payout
+                }}
+            ))
+    
+    async def update_side_bet_outcomes(self, game_id: str, game_end_tick: int,
+                                       uow: Optional["UnitOfWork"] = None):
+        """Update all side bets for a game with outcomes (queued on uow when given)"""
         if not self.persistence_enabled:
             return
             
         try:
-            cursor = self.side_bets.find({
-                "game_id": game_id,
-                "actual_outcome": "PENDING"
-            })
+            own_uow = uow is None
+            if own_uow:
+                uow = UnitOfWork(self)
             
-            side_bets = await cursor.to_list(None)
+            side_bets = await self.find_pending_side_bets(game_id)
+            self.queue_side_bet_outcomes(uow, side_bets, game_end_tick)
             
-            for bet_doc in side_bets:
-                bet = SideBetRecord(**bet_doc)
-                payout = bet.calculate_payout(game_end_tick)
-                
-                await self.side_bets.update_one(
-                    {"_id": bet_doc["_id"]},
-                    {"$set": {
-                        "actual_outcome": bet.actual_outcome.value,
-                        "payout": payout
-                    }}
-                )
+            if own_uow:
+                await uow.commit()
                 
         except Exception as e:
             logger.error(f"Error updating side bet outcomes for game {game_id}: {e}")
@@ -327,7 +480,7 @@ class GameRepository:
                     "game_id": tick_sample.game_id,
                     "tick": tick_sample.tick
                 },
-                {"$set": tick_sample.dict()},
+                {"$set": tick_sample.model_dump()},
                 upsert=True
             )
             
@@ -341,29 +494,27 @@ class GameRepository:
             return None
     
     async def save_tick_samples_batch(self, samples: List[TickSample]) -> int:
-        """Save multiple tick samples efficiently"""
+        """
+        Save multiple tick samples efficiently.
+        Samples are immutable, so they are plain inserts; re-sent ticks hit the
+        unique (game_id, tick) index and are skipped.
+        """
         if not self.persistence_enabled or not samples:
             return 0
             
         try:
-            # Prepare bulk operations
-            operations = []
-            for sample in samples:
-                operations.append({
-                    "update_one": {
-                        "filter": {
-                            "game_id": sample.game_id,
-                            "tick": sample.tick
-                        },
-                        "update": {"$set": sample.dict()},
-                        "upsert": True
-                    }
-                })
-            
-            # Execute bulk write
-            result = await self.tick_samples.bulk_write(operations, ordered=False)
+            operations = [InsertOne(sample.model_dump()) for sample in samples]
+            
+            try:
+                result = await self.tick_samples.bulk_write(operations, ordered=False)
+                saved_count = result.inserted_count
+            except BulkWriteError as bwe:
+                # Unordered: every non-duplicate insert still went through
+                errors = bwe.details.get("writeErrors", [])
+                if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+                    raise
+                saved_count = bwe.details.get("nInserted", 0)
             
-            saved_count = result.upserted_count + result.modified_count
             self.status.records_saved_total += saved_count
             
             return saved_count
@@ -372,6 +523,72 @@ class GameRepository:
             logger.error(f"Error in batch save of tick samples: {e}")
             return 0
     
+    async def save_tick_chunks(self, samples: List[TickSample],
+                               chunk_size: int = TICK_CHUNK_SIZE) -> int:
+        """
+        Pack samples into columnar TickChunk documents, one insert_many per call.
+        Chunks already stored by an earlier attempt hit the unique
+        (game_id, start_tick) index and are skipped.
+        """
+        if not self.persistence_enabled or not samples:
+            return 0
+            
+        try:
+            by_game: Dict[str, List[TickSample]] = {}
+            for sample in samples:
+                by_game.setdefault(sample.game_id, []).append(sample)
+            
+            documents = []
+            for game_samples in by_game.values():
+                game_samples.sort(key=lambda sample: sample.tick)
+                for i in range(0, len(game_samples), chunk_size):
+                    documents.append(
+                        TickChunk.from_samples(game_samples[i:i + chunk_size]).model_dump()
+                    )
+            
+            saved_count = len(samples)
+            try:
+                await self.tick_chunks.insert_many(documents, ordered=False)
+            except BulkWriteError as bwe:
+                # Unordered: every non-duplicate chunk still went through
+                errors = bwe.details.get("writeErrors", [])
+                if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+                    raise
+                saved_count -= sum(len(documents[err["index"]]["ticks"]) for err in errors)
+            
+            self.status.records_saved_total += saved_count
+            return saved_count
+            
+        except Exception as e:
+            logger.error(f"Error saving tick chunks: {e}")
+            self.status.last_error = str(e)
+            self.status.error_count += 1
+            return 0
+    
+    async def get_tick_samples(self, game_id: str, start_tick: int, end_tick: int) -> List[TickSample]:
+        """Reconstruct a game's tick samples in [start_tick, end_tick] from its chunks"""
+        if not self.persistence_enabled:
+            return []
+            
+        try:
+            cursor = self.tick_chunks.find({
+                "game_id": game_id,
+                "start_tick": {"$lte": end_tick},
+                "end_tick": {"$gte": start_tick}
+            }).sort("start_tick", 1)
+            
+            samples = []
+            async for chunk_doc in cursor:
+                samples.extend(
+                    sample for sample in TickChunk(**chunk_doc).to_samples()
+                    if start_tick <= sample.tick <= end_tick
+                )
+            return samples
+            
+        except Exception as e:
+            logger.error(f"Error reading tick chunks for game {game_id}: {e}")
+            return []
+    
     # Metrics Operations
     
     async def calculate_hourly_metrics(self, hour_start: datetime, hour_end: datetime) -> HourlyMetrics:
@@ -480,7 +697,7 @@ class GameRepository:
             )
             
             # Save metrics
-            await self.metrics.insert_one(metrics.dict())
+            await self.metrics.insert_one(metrics.model_dump())
             
             return metrics
             
@@ -490,6 +707,30 @@ class GameRepository:
     
     # Data Retention
     
+    async def _delete_before(self, name: str, cutoff: datetime) -> int:
+        """
+        Delete documents older than cutoff in chronological CLEANUP_CHUNK
+        slices, yielding between slices so no single delete runs long.
+        """
+        collection = getattr(self, name)
+        oldest = await collection.find_one(
+            {"created_at": {"$lt": cutoff}},
+            projection={"created_at": 1},
+            sort=[("created_at", 1)]
+        )
+        if not oldest:
+            return 0
+        
+        deleted = 0
+        start = oldest["created_at"]
+        while start < cutoff:
+            end = min(start + CLEANUP_CHUNK, cutoff)
+            result = await collection.delete_many({"created_at": {"$gte": start, "$lt": end}})
+            deleted += result.deleted_count
+            start = end
+            await asyncio.sleep(0)
+        return deleted
+    
     async def cleanup_old_data(self, retention_days: Dict[str, int]) -> Dict[str, int]:
         """Remove old data based on retention policies"""
         if not self.persistence_enabled:
@@ -498,29 +739,28 @@ class GameRepository:
         deleted_counts = {}
         
         try:
-            # Clean tick samples (highest volume, shortest retention)
-            if "tick_samples" in retention_days:
-                cutoff = datetime.utcnow() - timedelta(days=retention_days["tick_samples"])
-                result = await self.tick_samples.delete_many({"created_at": {"$lt": cutoff}})
-                deleted_counts["tick_samples"] = result.deleted_count
-            
-            # Clean predictions
-            if "predictions" in retention_days:
-                cutoff = datetime.utcnow() - timedelta(days=retention_days["predictions"])
-                result = await self.predictions.delete_many({"created_at": {"$lt": cutoff}})
-                deleted_counts["predictions"] = result.deleted_count
-            
-            # Clean side bets
-            if "side_bets" in retention_days:
-                cutoff = datetime.utcnow() - timedelta(days=retention_days["side_bets"])
-                result = await self.side_bets.delete_many({"created_at": {"$lt": cutoff}})
-                deleted_counts["side_bets"] = result.deleted_count
-            
-            # Clean games
-            if "games" in retention_days:
-                cutoff = datetime.utcnow() - timedelta(days=retention_days["games"])
-                result = await self.games.delete_many({"created_at": {"$lt": cutoff}})
-                deleted_counts["games"] = result.deleted_count
+            # Collections with a TTL index are expired server-side; only
+            # sweep the ones that still rely on this fallback.
+            names = [
+                name for name in ("tick_samples", "tick_chunks", "predictions", "side_bets", "games")
+                if name in retention_days
+            ]
+            ttl_managed = await asyncio.gather(*(self._has_ttl_index(name) for name in names))
+            
+            # One clock snapshot for every cutoff (naive UTC, like created_at)
+            now = datetime.utcnow()
+            cutoffs = {
+                name: now - timedelta(days=retention_days[name])
+                for name, managed in zip(names, ttl_managed)
+                if not managed
+            }
+            
+            # Collections are swept concurrently (total latency is the slowest
+            # one); each sweep deletes in small chronological chunks.
+            results = await asyncio.gather(
+                *(self._delete_before(name, cutoff) for name, cutoff in cutoffs.items())
+            )
+            deleted_counts.update(zip(cutoffs, results))
             
             # Metrics are kept indefinitely (low volume)
             
@@ -542,4 +782,71 @@ class GameRepository:
             "records_pending": self.status.records_pending,
             "errors": self.status.error_count,
             "last_error": self.status.last_error
-        }
\ No newline at end of file
+        }
+
+
+class UnitOfWork:
+    """
+    Queues writes across collections and flushes them at commit time with one
+    unordered bulk_write per collection, issued concurrently.
+    Collections are addressed by their GameRepository attribute name.
+    """
+    
+    def __init__(self, repo: GameRepository):
+        self.repo = repo
+        self._ops: Dict[str, List[Union[UpdateOne, InsertOne]]] = {}
+    
+    def queue(self, collection: str, operation: Union[UpdateOne, InsertOne]):
+        """Queue a raw write operation for a collection"""
+        self._ops.setdefault(collection, []).append(operation)
+    
+    def queue_game(self, game: GameRecord):
+        """Queue an upsert of a game record (updated_at is stamped server-side)"""
+        self.queue("games", UpdateOne(
+            {"game_id": game.game_id},
+            {"$set": game.model_dump(exclude={"updated_at"}), "$currentDate": {"updated_at": True}},
+            upsert=True
+        ))
+    
+    def queue_prediction(self, prediction: PredictionRecord):
+        """Queue an upsert of a prediction record"""
+        self.queue("predictions", UpdateOne(
+            {"game_id": prediction.game_id, "predicted_at_tick": prediction.predicted_at_tick},
+            {"$set": prediction.model_dump()},
+            upsert=True
+        ))
+    
+    def queue_side_bet(self, side_bet: SideBetRecord):
+        """Queue an upsert of a side bet record"""
+        self.queue("side_bets", UpdateOne(
+            {"game_id": side_bet.game_id, "placed_at_tick": side_bet.placed_at_tick},
+            {"$set": side_bet.model_dump()},
+            upsert=True
+        ))
+    
+    @property
+    def pending(self) -> int:
+        """Number of queued operations"""
+        return sum(len(ops) for ops in self._ops.values())
+    
+    async def commit(self) -> Dict[str, Any]:
+        """Flush all queued operations; returns the bulk_write result per collection"""
+        batches = {name: ops for name, ops in self._ops.items() if ops}
+        self._ops = {}
+        if not batches:
+            return {}
+        
+        results = await asyncio.gather(
+            *(getattr(self.repo, name).bulk_write(ops, ordered=False) for name, ops in batches.items()),
+            return_exceptions=True
+        )
+        
+        committed = {}
+        for name, result in zip(batches, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error committing {len(batches[name])} writes to {name}: {result}")
+                self.repo.status.last_error = str(result)
+                self.repo.status.error_count += 1
+            else:
+                committed[name] = result
+        return committed
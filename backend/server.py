@@ -6,13 +6,14 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 import uuid
 from datetime import datetime
 import asyncio
 import json
 import socketio
 from collections import deque
+import numpy as np
 from tick_features import TickFeatureEngine
 
 # Load env
@@ -21,7 +22,7 @@ load_dotenv(ROOT_DIR / '.env')
 
 # Import persistence integration (safe - will be no-op if disabled)
 try:
-    from persistence_integration import setup_persistence, PersistenceIntegration
+    from persistence_integration import setup_persistence, PersistenceIntegration, get_client
     persistence_available = True
 except ImportError:
     persistence_available = False
@@ -30,7 +31,8 @@ except ImportError:
 
 # MongoDB connection - with safe fallback
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Share the persistence layer's pooled client when it is available
+client = get_client(mongo_url) if persistence_available else AsyncIOMotorClient(mongo_url)
 
 # Use DB_NAME if provided, otherwise fallback to 'rugs_tracker' or extract from URL
 if 'DB_NAME' in os.environ:
@@ -132,8 +134,23 @@ ULTRA_SHORT_THRESHOLD = 10
 MAX_PAYOUT_THRESHOLD = 0.019
 SIDEBET_WINDOW_TICKS = int(os.getenv("SIDEBET_WINDOW_TICKS", "40"))
 SIDEBET_COOLDOWN_TICKS = int(os.getenv("SIDEBET_COOLDOWN_TICKS", "4"))
+# A bet placed at tick t covers t..t+window-1; the next one may fire once the cooldown has elapsed
+NEXT_ELIGIBLE_OFFSET = SIDEBET_WINDOW_TICKS + SIDEBET_COOLDOWN_TICKS
 SIDEBET_PWIN_THRESHOLD = float(os.getenv("SIDEBET_PWIN_THRESHOLD", "0.20"))
 
+# Strong references to in-flight persistence tasks; the event loop only keeps
+# weak ones, so an unreferenced task can be collected before it finishes
+_persistence_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn_persistence(coro) -> asyncio.Task:
+    """Schedule a persistence coroutine and hold it until it is done"""
+    task = asyncio.create_task(coro)
+    _persistence_tasks.add(task)
+    task.add_done_callback(_persistence_tasks.discard)
+    return task
+
+
 # Enhanced tracker with side bet integration
 class IntegratedPatternTracker:
     """Main tracker integrating all pattern engines and side bet logic"""
@@ -193,7 +210,7 @@ class IntegratedPatternTracker:
             
             # Persist game start if available
             if persistence and persistence.enabled:
-                asyncio.create_task(persistence.on_game_start(
+                _spawn_persistence(persistence.on_game_start(
                     game_id=game_id,
                     start_tick=0,
                     initial_price=current_price
@@ -257,6 +274,20 @@ class IntegratedPatternTracker:
             if elapsed_ms > self.stream_max_cpu_ms:
                 logger.warning(f"Tick feature processing exceeded budget: {elapsed_ms:.1f}ms")
         
+        # Persist sampled ticks (PERSISTENCE_TICK_SAMPLE_EVERY); the batcher
+        # packs them into columnar chunks
+        if persistence and persistence.enabled and current_tick % persistence.tick_sample_every == 0:
+            tick_features = ml_tick.to_dict() if ml_tick else {}
+            _spawn_persistence(persistence.on_tick(
+                game_id=game_id,
+                tick=current_tick,
+                price=current_price,
+                features={
+                    name: float(value) for name, value in tick_features.items()
+                    if name not in ('game_id', 'tick', 'price')
+                }
+            ))
+        
         # Get predictions
         prediction = self.ml_engine.predict_rug_timing(
             current_tick, current_price, self.current_game['peak_price']
@@ -274,7 +305,7 @@ class IntegratedPatternTracker:
         # Persist prediction if available
         if persistence and persistence.enabled and prediction:
             predicted_tick = prediction.get('predicted_tick', prediction.get('prediction', 0))
-            asyncio.create_task(persistence.on_prediction_made(
+            _spawn_persistence(persistence.on_prediction_made(
                 game_id=game_id,
                 predicted_at_tick=current_tick,
                 predicted_end_tick=int(predicted_tick),
@@ -292,9 +323,8 @@ class IntegratedPatternTracker:
         
         # Hazard-based side bet recommendation with 40+4 gating
         side_bet = None
-        can_recommend = True
-        if self.last_side_bet_active_until is not None:
-            can_recommend = current_tick > (self.last_side_bet_active_until + SIDEBET_COOLDOWN_TICKS)
+        can_recommend = (self.last_side_bet_tick is None
+                         or current_tick >= self.last_side_bet_tick + NEXT_ELIGIBLE_OFFSET)
         if can_recommend:
             side_bet = self.ml_engine.side_bet_signal(
                 current_tick, current_price, self.current_game['peak_price']
@@ -354,7 +384,7 @@ class IntegratedPatternTracker:
         
         # Persist game end if available
         if persistence and persistence.enabled:
-            asyncio.create_task(persistence.on_game_end(
+            _spawn_persistence(persistence.on_game_end(
                 game_id=completed_game.game_id,
                 end_tick=completed_game.final_tick,
                 final_price=completed_game.end_price,
@@ -462,6 +492,27 @@ class IntegratedPatternTracker:
             logger.error(f"Tolerance quantization error: {e}")
         return prediction
 
+    def _quantize_predictions_batch(self, preds: np.ndarray, current_ticks: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Vectorized _quantize_prediction_tolerance for N predictions at once.
+        preds is an (N, 2) int array of [predicted_tick, tolerance]; current_ticks has shape (N,).
+        Returns a struct-of-arrays dict with the same keys the scalar path sets.
+        """
+        centers = preds[:, 0].astype(np.int64)
+        tols = np.maximum(0, preds[:, 1]).astype(np.int64)
+        back_limit = np.maximum(0, centers - current_ticks)
+        new_tol = (np.minimum(tols, back_limit) // 20) * 20
+        lower = np.maximum(current_ticks, centers - new_tol)
+        upper = centers + new_tol
+        width = np.maximum(0, upper - lower)
+        windows = np.maximum(1, (width + (SIDEBET_WINDOW_TICKS - 1)) // SIDEBET_WINDOW_TICKS)
+        return {
+            "tolerance": new_tol,
+            "coverage_lower": lower,
+            "coverage_upper": upper,
+            "coverage_windows": windows,
+        }
+
     def _record_side_bet_recommendation(self, side_bet, game_id, tick):
         """Record side bet recommendation"""
         if side_bet:
@@ -480,7 +531,7 @@ class IntegratedPatternTracker:
             
             # Persist side bet if available
             if persistence and persistence.enabled:
-                asyncio.create_task(persistence.on_side_bet_placed(
+                _spawn_persistence(persistence.on_side_bet_placed(
                     game_id=game_id,
                     placed_at_tick=tick,
                     probability=record['probability'],
@@ -12,13 +12,13 @@ import logging
 try:
     from ..models.storage import (
         GameRecord, PredictionRecord, SideBetRecord,
-        TickSample, SideBetRecommendation
+        SideBetRecommendation
     )
     from ..repositories.game_repository import GameRepository
 except ImportError:
     from models.storage import (
         GameRecord, PredictionRecord, SideBetRecord,
-        TickSample, SideBetRecommendation
+        SideBetRecommendation
     )
     from repositories.game_repository import GameRepository
 
@@ -47,6 +47,7 @@ class PersistenceManager:
         # Retention policies (days)
         self.retention_days = {
             "tick_samples": int(os.getenv("TICK_RETENTION_DAYS", "7")),
+            "tick_chunks": int(os.getenv("TICK_RETENTION_DAYS", "7")),
             "predictions": int(os.getenv("PREDICTION_RETENTION_DAYS", "90")),
             "side_bets": int(os.getenv("SIDEBET_RETENTION_DAYS", "90")),
             "games": int(os.getenv("GAME_RETENTION_DAYS", "180"))
@@ -70,6 +71,7 @@ class PersistenceManager:
         
         # Initialize database indexes
         await self.repo.initialize_indexes()
+        await self.repo.ensure_ttl_indexes(self.retention_days)
         
         # Start background tasks
         self.tasks = [
@@ -105,8 +107,7 @@ class PersistenceManager:
                 # Track what we've saved
                 saved_counts = {
                     "predictions": 0,
-                    "side_bets": 0,
-                    "tick_samples": 0
+                    "side_bets": 0
                 }
                 
                 # Save prediction history
@@ -161,28 +162,8 @@ class PersistenceManager:
                         if saved_counts["side_bets"] >= self.batch_size:
                             break
                 
-                # Save tick samples (sample every 10th tick to reduce volume)
-                tick_samples = []
-                tick_list = list(self.tracker.tick_ring)
-                
-                for i, tick_data in enumerate(tick_list):
-                    # Sample every 10th tick and ensure not already persisted
-                    if i % 10 == 0 and not tick_data.get("_persisted"):
-                        if "game_id" in tick_data and "tick" in tick_data:
-                            tick_sample = TickSample(
-                                game_id=tick_data["game_id"],
-                                tick=tick_data["tick"],
-                                price=tick_data.get("price", 0),
-                                features=tick_data.get("features", {}),
-                                timestamp=tick_data.get("timestamp", datetime.utcnow())
-                            )
-                            tick_samples.append(tick_sample)
-                            tick_data["_persisted"] = True
-                
-                # Batch save tick samples
-                if tick_samples:
-                    saved_count = await self.repo.save_tick_samples_batch(tick_samples[:self.batch_size])
-                    saved_counts["tick_samples"] = saved_count
+                # Ticks are not sampled from tick_ring here: every tick is
+                # written as it arrives via PersistenceIntegration.on_tick
                 
                 # Log if we saved anything
                 if any(saved_counts.values()):
@@ -4,15 +4,14 @@ Migration script to initialize MongoDB for persistent storage.
 Creates indexes and validates database setup.
 
 Usage:
-    python scripts/migrate_to_persistent.py [--check-only]
+    python scripts/migrate_to_persistent.py [--check-only] [--fresh]
 """
 
 import asyncio
 import os
 import sys
 from pathlib import Path
-from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
 import logging
 import argparse
 
@@ -21,6 +20,8 @@ sys.path.append(str(Path(__file__).parent.parent / "backend"))
 
 from dotenv import load_dotenv
 
+from mongo_options import motor_client
+
 # Load environment - try backend/.env first, then current directory
 env_path = Path(__file__).parent.parent / "backend" / ".env"
 if env_path.exists():
@@ -35,13 +36,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Connection settings, read once after the .env file is loaded
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/rugs_tracker")
+DB_NAME = os.getenv("DB_NAME", "rugs_tracker")
+
+# tick_samples and tick_chunks expire server-side via a TTL index on
+# created_at, using the same retention window the persistence manager applies
+TICK_TTL_SECONDS = int(os.getenv("TICK_RETENTION_DAYS", "7")) * 24 * 3600
+
+# Collections used by the persistence layer
+REQUIRED_COLLECTIONS = [
+    "games", "predictions", "side_bets", "metrics_hourly", "tick_samples", "tick_chunks"
+]
+
+# Indexes from earlier migrations that are now covered by compound prefixes
+REDUNDANT_INDEXES = {
+    "predictions": ["game_id_1"],
+    "side_bets": ["game_id_1"]
+}
+
 
 class PersistenceMigration:
     """Handle database setup and migration for persistence"""
     
     def __init__(self, mongo_url: str, db_name: str):
-        self.client = AsyncIOMotorClient(mongo_url)
+        self.client = motor_client(mongo_url)
         self.db = self.client[db_name]
+        self.collections = {name: self.db[name] for name in REQUIRED_COLLECTIONS}
         self.collections_created = []
         self.indexes_created = []
     
@@ -56,20 +77,22 @@ class PersistenceMigration:
             logger.error(f"✗ MongoDB connection failed: {e}")
             return False
     
+    async def reset(self) -> bool:
+        """Drop all persistence collections (metadata-only, no per-document deletes)"""
+        try:
+            await asyncio.gather(*[self.db.drop_collection(name) for name in REQUIRED_COLLECTIONS])
+            logger.info(f"✓ Dropped collections: {', '.join(REQUIRED_COLLECTIONS)}")
+            return True
+        except Exception as e:
+            logger.error(f"✗ Error dropping collections: {e}")
+            return False
+    
     async def create_collections(self) -> bool:
         """Create required collections if they don't exist"""
         try:
             existing = await self.db.list_collection_names()
             
-            required_collections = [
-                "games",
-                "predictions", 
-                "side_bets",
-                "metrics_hourly",
-                "tick_samples"
-            ]
-            
-            for collection in required_collections:
+            for collection in REQUIRED_COLLECTIONS:
                 if collection not in existing:
                     await self.db.create_collection(collection)
                     self.collections_created.append(collection)
@@ -83,83 +106,92 @@ class PersistenceMigration:
             logger.error(f"✗ Error creating collections: {e}")
             return False
     
+    async def _index_build_options(self) -> dict:
+        """Index build options appropriate for the connected server version"""
+        try:
+            build_info = await self.db.command("buildInfo")
+            version = tuple(build_info.get("versionArray", [0, 0])[:2])
+        except Exception as e:
+            logger.warning(f"Could not determine MongoDB version, building in background: {e}")
+            return {"background": True}
+        
+        logger.info(f"  MongoDB server version: {build_info.get('version', 'unknown')}")
+        return {} if version >= (4, 2) else {"background": True}
+    
     async def create_indexes(self) -> bool:
         """Create all required indexes for optimal performance"""
         try:
-            # Games collection indexes
-            games_indexes = [
-                ("game_id", {"unique": True}),
-                ([("created_at", -1)], {}),
-                ([("duration_ticks", 1)], {}),
-                ([("created_at", -1), ("had_predictions", 1)], {})
-            ]
-            
-            for index_spec in games_indexes:
-                if isinstance(index_spec[0], str):
-                    index_name = await self.db.games.create_index(index_spec[0], **index_spec[1])
-                else:
-                    index_name = await self.db.games.create_index(index_spec[0], **index_spec[1])
-                self.indexes_created.append(f"games.{index_name}")
-            
-            logger.info("✓ Created indexes for games collection")
-            
-            # Predictions collection indexes
-            pred_indexes = [
-                ("game_id", {}),
-                ([("created_at", -1)], {}),
-                ([("game_id", 1), ("predicted_at_tick", 1)], {}),
-                ("error_metrics.e40", {})
-            ]
-            
-            for index_spec in pred_indexes:
-                if isinstance(index_spec[0], str):
-                    index_name = await self.db.predictions.create_index(index_spec[0], **index_spec[1])
-                else:
-                    index_name = await self.db.predictions.create_index(index_spec[0], **index_spec[1])
-                self.indexes_created.append(f"predictions.{index_name}")
-            
-            logger.info("✓ Created indexes for predictions collection")
-            
-            # Side bets collection indexes
-            bet_indexes = [
-                ("game_id", {}),
-                ([("created_at", -1)], {}),
-                ([("game_id", 1), ("placed_at_tick", 1)], {}),
-                ("actual_outcome", {})
-            ]
-            
-            for index_spec in bet_indexes:
-                if isinstance(index_spec[0], str):
-                    index_name = await self.db.side_bets.create_index(index_spec[0], **index_spec[1])
-                else:
-                    index_name = await self.db.side_bets.create_index(index_spec[0], **index_spec[1])
-                self.indexes_created.append(f"side_bets.{index_name}")
+            # Foreground builds lock populated collections on pre-4.2 servers;
+            # 4.2+ always uses hybrid builds and ignores the background flag
+            build_options = await self._index_build_options()
             
-            logger.info("✓ Created indexes for side_bets collection")
+            def index(keys, **options):
+                return IndexModel(keys, **build_options, **options)
             
-            # Metrics collection indexes
-            metrics_indexes = [
-                ([("hour_start", -1)], {}),
-                ([("hour_start", -1), ("hour_end", -1)], {})
-            ]
+            index_plan = {
+                # Games collection indexes
+                "games": [
+                    index([("game_id", ASCENDING)], unique=True),
+                    index([("created_at", DESCENDING)]),
+                    index([("duration_ticks", ASCENDING)]),
+                    index([("created_at", DESCENDING), ("had_predictions", ASCENDING)])
+                ],
+                # Predictions collection indexes. Per-game reads filter on
+                # game_id alone (no per-game created_at sort), so no
+                # (game_id, created_at) compound is needed. Equality on game_id
+                # alone is served by the leftmost prefix of (game_id, predicted_at_tick)
+                "predictions": [
+                    index([("created_at", DESCENDING)]),
+                    index([("game_id", ASCENDING), ("predicted_at_tick", ASCENDING)]),
+                    # Pending-outcome lookup in update_prediction_outcome. Partial
+                    # rather than sparse: game_id is always present, so a sparse
+                    # compound would still index every resolved prediction
+                    index(
+                        [("game_id", ASCENDING), ("actual_end_tick", ASCENDING)],
+                        name="game_pending",
+                        partialFilterExpression={"actual_end_tick": None}
+                    ),
+                    index([("error_metrics.e40", ASCENDING)])
+                ],
+                # Side bets collection indexes. Equality on game_id alone is
+                # served by the leftmost prefix of (game_id, placed_at_tick)
+                "side_bets": [
+                    index([("created_at", DESCENDING)]),
+                    index([("game_id", ASCENDING), ("placed_at_tick", ASCENDING)]),
+                    index([("actual_outcome", ASCENDING)])
+                ],
+                # Metrics collection indexes
+                "metrics_hourly": [
+                    index([("hour_start", DESCENDING)]),
+                    index([("hour_start", DESCENDING), ("hour_end", DESCENDING)])
+                ],
+                # Tick samples collection indexes. Equality on game_id leads;
+                # a most-recent-first tick scan within a game walks this
+                # index backwards, so a (game_id, tick: -1) twin is redundant
+                "tick_samples": [
+                    index([("game_id", ASCENDING), ("tick", ASCENDING)], unique=True),
+                    index([("created_at", DESCENDING)]),
+                    index([("created_at", ASCENDING)], expireAfterSeconds=TICK_TTL_SECONDS, name="created_at_ttl")
+                ],
+                # Columnar tick chunks: tick-range lookups per game, unique so
+                # a retried flush cannot store the same chunk twice
+                "tick_chunks": [
+                    index([("game_id", ASCENDING), ("start_tick", ASCENDING)], unique=True),
+                    index([("created_at", ASCENDING)], expireAfterSeconds=TICK_TTL_SECONDS, name="created_at_ttl")
+                ]
+            }
             
-            for index_spec in metrics_indexes:
-                index_name = await self.db.metrics_hourly.create_index(index_spec[0], **index_spec[1])
-                self.indexes_created.append(f"metrics_hourly.{index_name}")
+            # One createIndexes command per collection, all dispatched concurrently
+            results = await asyncio.gather(*[
+                self.collections[collection].create_indexes(models)
+                for collection, models in index_plan.items()
+            ])
             
-            logger.info("✓ Created indexes for metrics_hourly collection")
+            for collection, index_names in zip(index_plan, results):
+                self.indexes_created.extend(f"{collection}.{name}" for name in index_names)
+                logger.info(f"✓ Created indexes for {collection} collection")
             
-            # Tick samples collection indexes
-            tick_indexes = [
-                ([("game_id", 1), ("tick", 1)], {"unique": True}),
-                ([("created_at", -1)], {})
-            ]
-            
-            for index_spec in tick_indexes:
-                index_name = await self.db.tick_samples.create_index(index_spec[0], **index_spec[1])
-                self.indexes_created.append(f"tick_samples.{index_name}")
-            
-            logger.info("✓ Created indexes for tick_samples collection")
+            await self.drop_redundant_indexes()
             
             return True
             
@@ -167,12 +199,22 @@ class PersistenceMigration:
             logger.error(f"✗ Error creating indexes: {e}")
             return False
     
+    async def drop_redundant_indexes(self):
+        """Drop legacy indexes whose keys are a prefix of a compound index"""
+        for collection, index_names in REDUNDANT_INDEXES.items():
+            handle = self.collections[collection]
+            existing = await handle.index_information()
+            for index_name in index_names:
+                if index_name in existing:
+                    await handle.drop_index(index_name)
+                    logger.info(f"✓ Dropped redundant index {collection}.{index_name}")
+    
     async def verify_setup(self) -> bool:
         """Verify database is properly set up"""
         try:
             # Check collections exist
             collections = await self.db.list_collection_names()
-            required = ["games", "predictions", "side_bets", "metrics_hourly", "tick_samples"]
+            required = REQUIRED_COLLECTIONS
             
             missing = set(required) - set(collections)
             if missing:
@@ -180,15 +222,23 @@ class PersistenceMigration:
                 return False
             
             # Check indexes
-            for collection_name in required:
-                collection = self.db[collection_name]
-                indexes = await collection.list_indexes().to_list(None)
+            index_lists = await asyncio.gather(*[
+                self.collections[name].list_indexes().to_list(None) for name in required
+            ])
+            for collection_name, indexes in zip(required, index_lists):
                 logger.info(f"  {collection_name}: {len(indexes)} indexes")
             
-            # Test write/read
-            test_doc = {"test": True, "timestamp": datetime.utcnow()}
-            result = await self.db.games.insert_one(test_doc)
-            await self.db.games.delete_one({"_id": result.inserted_id})
+            # Read probe on every collection plus a privilege check, so
+            # verification never writes to (or pollutes the oplog of) a live DB
+            await asyncio.gather(*[
+                self.collections[name].find_one({}, projection={"_id": 1}) for name in required
+            ])
+            
+            conn_status = await self.db.command("connectionStatus", showPrivileges=True)
+            missing_actions = self._missing_write_privileges(conn_status.get("authInfo", {}))
+            if missing_actions:
+                logger.warning(f"Account lacks write privileges on {self.db.name}: {sorted(missing_actions)}")
+                return False
             
             logger.info("✓ Database verification complete")
             return True
@@ -197,20 +247,35 @@ class PersistenceMigration:
             logger.error(f"✗ Database verification failed: {e}")
             return False
     
+    def _missing_write_privileges(self, auth_info: dict) -> set:
+        """Write actions the authenticated user lacks on this database"""
+        required_actions = {"insert", "update", "remove"}
+        
+        # No authenticated users means access control is off
+        if not auth_info.get("authenticatedUsers"):
+            return set()
+        
+        granted = set()
+        for privilege in auth_info.get("authenticatedUserPrivileges", []):
+            resource = privilege.get("resource", {})
+            if resource.get("anyResource") or resource.get("db") in (self.db.name, ""):
+                granted.update(privilege.get("actions", []))
+        
+        return required_actions - granted
+    
     async def get_stats(self) -> dict:
         """Get current database statistics"""
         stats = {}
         
         try:
-            # Get collection counts
-            stats["games"] = await self.db.games.count_documents({})
-            stats["predictions"] = await self.db.predictions.count_documents({})
-            stats["side_bets"] = await self.db.side_bets.count_documents({})
-            stats["metrics_hourly"] = await self.db.metrics_hourly.count_documents({})
-            stats["tick_samples"] = await self.db.tick_samples.count_documents({})
+            # Collection counts come from metadata (O(1)), gathered with dbStats
+            *counts, db_stats = await asyncio.gather(
+                *[self.collections[name].estimated_document_count() for name in REQUIRED_COLLECTIONS],
+                self.db.command("dbStats")
+            )
+            stats.update(zip(REQUIRED_COLLECTIONS, counts))
             
             # Get database size
-            db_stats = await self.db.command("dbStats")
             stats["db_size_mb"] = round(db_stats.get("dataSize", 0) / (1024 * 1024), 2)
             stats["index_size_mb"] = round(db_stats.get("indexSize", 0) / (1024 * 1024), 2)
             
@@ -225,12 +290,12 @@ class PersistenceMigration:
         self.client.close()
 
 
-async def main(check_only: bool = False):
+async def main(check_only: bool = False, fresh: bool = False):
     """Main migration function"""
     
     # Get configuration
-    mongo_url = os.getenv("MONGO_URL", "mongodb://localhost:27017/rugs_tracker")
-    db_name = os.getenv("DB_NAME", "rugs_tracker")
+    mongo_url = MONGO_URL
+    db_name = DB_NAME
     
     # Extract DB name from URL if not specified
     if "/" in mongo_url and not db_name:
@@ -263,6 +328,12 @@ async def main(check_only: bool = False):
             for key, value in stats.items():
                 logger.info(f"  {key}: {value}")
     else:
+        if fresh:
+            logger.warning("\n--- Dropping Existing Collections (--fresh) ---")
+            if not await migration.reset():
+                await migration.close()
+                return False
+        
         # Perform migration
         logger.info("\n--- Creating Collections ---")
         if not await migration.create_collections():
@@ -305,10 +376,17 @@ if __name__ == "__main__":
         help="Only verify setup without making changes"
     )
     
+    parser.add_argument(
+        "--fresh", "--drop-and-recreate",
+        dest="fresh",
+        action="store_true",
+        help="Drop all persistence collections before recreating them (destroys data)"
+    )
+    
     args = parser.parse_args()
     
     # Run migration
-    success = asyncio.run(main(check_only=args.check_only))
+    success = asyncio.run(main(check_only=args.check_only, fresh=args.fresh))
     
     # Exit with appropriate code
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,19 @@
+"""
+Motor client settings shared by the persistence maintenance scripts.
+"""
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Pool bounds, fail-fast server selection and wire compression for bulk
+# migration traffic (zlib ships with the driver; zstd/snappy need extras)
+MOTOR_CLIENT_OPTIONS = {
+    "maxPoolSize": 32,
+    "minPoolSize": 4,
+    "compressors": "zlib",
+    "serverSelectionTimeoutMS": 5000,
+    "retryWrites": True
+}
+
+
+def motor_client(url: str) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(url, **MOTOR_CLIENT_OPTIONS)
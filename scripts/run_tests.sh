@@ -30,9 +30,9 @@ run_tests() {
     echo -e "\n${YELLOW}Running $test_name...${NC}"
     
     if [ "$COVERAGE" == "coverage" ]; then
-        pytest --cov=backend --cov-report=html --cov-report=term $test_path
+        pytest -n auto --cov=backend --cov-report=html --cov-report=term $test_path
     else
-        pytest -v $test_path
+        pytest -n auto -v $test_path
     fi
     
     if [ $? -eq 0 ]; then
@@ -4,6 +4,7 @@ Test script to verify persistence system is working correctly.
 This script tests both enabled and disabled states.
 """
 
+import argparse
 import asyncio
 import os
 import sys
@@ -16,7 +17,12 @@ import json
 sys.path.append(str(Path(__file__).parent.parent / "backend"))
 
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne
+
+from mongo_options import motor_client
+from repositories.game_repository import GameRepository
+from models.storage import GameRecord, PredictionRecord, SideBetRecord
+from persistence_integration import PersistenceIntegration
 
 # Load environment
 load_dotenv()
@@ -28,22 +34,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Connection settings, read once after the .env file is loaded
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/rugs_tracker")
+DB_NAME = os.getenv("DB_NAME", "rugs_tracker_test")  # Use test DB
+
+
+def prefix_range(prefix: str) -> dict:
+    """Index-range equivalent of an anchored prefix regex on a string field"""
+    return {"$gte": prefix, "$lt": prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+
+# All test documents use game_ids starting with "test_"
+TEST_PREFIX_RANGE = prefix_range("test_")
+
 
 class PersistenceTestSuite:
     """Test suite for persistence functionality"""
     
-    def __init__(self):
-        self.mongo_url = os.getenv("MONGO_URL", "mongodb://localhost:27017/rugs_tracker")
-        self.db_name = os.getenv("DB_NAME", "rugs_tracker_test")  # Use test DB
+    def __init__(self, fresh: bool = False):
+        self.mongo_url = MONGO_URL
+        self.db_name = DB_NAME
+        self.fresh = fresh
         self.client = None
         self.db = None
+        self.games = None
+        self.predictions = None
+        self.side_bets = None
         self.test_results = []
     
     async def setup(self):
         """Setup test environment"""
         try:
-            self.client = AsyncIOMotorClient(self.mongo_url)
+            # One pooled client shared by every test case
+            self.client = motor_client(self.mongo_url)
             self.db = self.client[self.db_name]
+            self.games = self.db.games
+            self.predictions = self.db.predictions
+            self.side_bets = self.db.side_bets
+            if self.fresh:
+                # Single metadata op instead of per-collection delete scans
+                await self.client.drop_database(self.db_name)
+                logger.info(f"✓ Dropped test database: {self.db_name}")
             logger.info(f"✓ Connected to MongoDB: {self.db_name}")
             return True
         except Exception as e:
@@ -53,10 +84,13 @@ class PersistenceTestSuite:
     async def cleanup(self):
         """Cleanup test data"""
         try:
-            # Clean test collections
-            await self.db.games.delete_many({"game_id": {"$regex": "^test_"}})
-            await self.db.predictions.delete_many({"game_id": {"$regex": "^test_"}})
-            await self.db.side_bets.delete_many({"game_id": {"$regex": "^test_"}})
+            # Clean test collections concurrently
+            test_filter = {"game_id": TEST_PREFIX_RANGE}
+            await asyncio.gather(
+                self.games.delete_many(test_filter),
+                self.predictions.delete_many(test_filter),
+                self.side_bets.delete_many(test_filter)
+            )
             logger.info("✓ Cleaned up test data")
         except Exception as e:
             logger.error(f"✗ Cleanup failed: {e}")
@@ -68,13 +102,8 @@ class PersistenceTestSuite:
         """Test that system works with persistence disabled"""
         test_name = "Persistence Disabled Mode"
         try:
-            # Set persistence disabled
-            os.environ["PERSISTENCE_ENABLED"] = "false"
-            
-            from repositories.game_repository import GameRepository
-            from models.storage import GameRecord
-            
-            repo = GameRepository(self.db)
+            # Persistence disabled via explicit flag (no shared env mutation)
+            repo = GameRepository(self.db, enabled=False)
             
             # Should be disabled
             assert repo.persistence_enabled is False, "Repository should be disabled"
@@ -90,7 +119,7 @@ class PersistenceTestSuite:
             assert result is None, "Save should return None when disabled"
             
             # Verify nothing was saved
-            count = await self.db.games.count_documents({"game_id": "test_disabled_001"})
+            count = await self.games.count_documents({"game_id": "test_disabled_001"})
             assert count == 0, "No data should be saved when disabled"
             
             self.test_results.append((test_name, "PASSED"))
@@ -110,13 +139,8 @@ class PersistenceTestSuite:
         """Test that persistence works when enabled"""
         test_name = "Persistence Enabled Mode"
         try:
-            # Set persistence enabled
-            os.environ["PERSISTENCE_ENABLED"] = "true"
-            
-            from repositories.game_repository import GameRepository
-            from models.storage import GameRecord, PredictionRecord, SideBetRecord
-            
-            repo = GameRepository(self.db)
+            # Persistence enabled via explicit flag (no shared env mutation)
+            repo = GameRepository(self.db, enabled=True)
             
             # Initialize indexes
             await repo.initialize_indexes()
@@ -135,7 +159,9 @@ class PersistenceTestSuite:
             assert result == "test_enabled_001", "Save should return game_id"
             
             # Verify it was saved
-            saved_game = await self.db.games.find_one({"game_id": "test_enabled_001"})
+            saved_game = await self.games.find_one(
+                {"game_id": "test_enabled_001"}, projection={"_id": 0, "peak_price": 1}
+            )
             assert saved_game is not None, "Game should be saved"
             assert saved_game["peak_price"] == 1.0, "Game data should match"
             
@@ -153,7 +179,9 @@ class PersistenceTestSuite:
             await repo.update_game_end("test_enabled_001", 290, 5.2)
             
             # Verify game was updated
-            updated_game = await self.db.games.find_one({"game_id": "test_enabled_001"})
+            updated_game = await self.games.find_one(
+                {"game_id": "test_enabled_001"}, projection={"_id": 0, "end_tick": 1, "final_price": 1}
+            )
             assert updated_game["end_tick"] == 290, "End tick should be updated"
             assert updated_game["final_price"] == 5.2, "Final price should be updated"
             
@@ -161,7 +189,9 @@ class PersistenceTestSuite:
             await repo.update_prediction_outcome("test_enabled_001", 290)
             
             # Verify prediction was updated
-            updated_pred = await self.db.predictions.find_one({"game_id": "test_enabled_001"})
+            updated_pred = await self.predictions.find_one(
+                {"game_id": "test_enabled_001"}, projection={"_id": 0, "actual_end_tick": 1, "error_metrics": 1}
+            )
             assert updated_pred["actual_end_tick"] == 290, "Actual tick should be set"
             assert updated_pred["error_metrics"] is not None, "Error metrics should be calculated"
             assert updated_pred["error_metrics"]["raw_error"] == -10, "Error should be -10"
@@ -182,13 +212,10 @@ class PersistenceTestSuite:
     async def test_integration(self):
         """Test the integration module"""
         test_name = "Integration Module"
+        integration = None
         try:
-            os.environ["PERSISTENCE_ENABLED"] = "true"
-            
-            from persistence_integration import PersistenceIntegration
-            
             # Create integration
-            integration = PersistenceIntegration(self.db)
+            integration = PersistenceIntegration(self.db, enabled=True)
             
             assert integration.enabled is True, "Integration should be enabled"
             assert integration.repo is not None, "Repository should be initialized"
@@ -206,14 +233,20 @@ class PersistenceTestSuite:
             await integration.on_game_end("test_integration_001", 275, 4.8)
             
             # Verify data was saved
-            game = await self.db.games.find_one({"game_id": "test_integration_001"})
+            game = await self.games.find_one(
+                {"game_id": "test_integration_001"}, projection={"_id": 0, "end_tick": 1}
+            )
             assert game is not None, "Game should be saved"
             assert game["end_tick"] == 275, "Game should have end data"
             
-            pred = await self.db.predictions.find_one({"game_id": "test_integration_001"})
+            pred = await self.predictions.find_one(
+                {"game_id": "test_integration_001"}, projection={"_id": 1}
+            )
             assert pred is not None, "Prediction should be saved"
             
-            bet = await self.db.side_bets.find_one({"game_id": "test_integration_001"})
+            bet = await self.side_bets.find_one(
+                {"game_id": "test_integration_001"}, projection={"_id": 1}
+            )
             assert bet is not None, "Side bet should be saved"
             
             # Test status
@@ -232,17 +265,83 @@ class PersistenceTestSuite:
             self.test_results.append((test_name, f"ERROR: {e}"))
             logger.error(f"✗ {test_name}: Unexpected error: {e}")
             return False
+        finally:
+            # Flush the tick batcher and shut down the record-building pool
+            if integration is not None:
+                await integration.stop()
+    
+    async def test_bulk_insert(self, n_games: int = 50):
+        """Test batched writes of materialized game/prediction/bet documents"""
+        test_name = "Bulk Insert"
+        try:
+            # Materialize every document up front
+            game_ids = [f"test_bulk_{i:03d}" for i in range(n_games)]
+            games = [
+                GameRecord(game_id=gid, start_tick=0, peak_price=1.0, peak_tick=0).model_dump()
+                for gid in game_ids
+            ]
+            preds = [
+                PredictionRecord(
+                    game_id=gid, predicted_at_tick=50, predicted_end_tick=280, confidence=0.7
+                ).model_dump()
+                for gid in game_ids
+            ]
+            bets = [
+                SideBetRecord(
+                    game_id=gid, placed_at_tick=100, window_end_tick=140,
+                    probability=0.22, expected_value=0.1, confidence=0.6,
+                    recommendation="BET"
+                ).model_dump()
+                for gid in game_ids
+            ]
+            
+            # One insert_many per collection instead of a round trip per document
+            await asyncio.gather(
+                self.predictions.insert_many(preds, ordered=False),
+                self.side_bets.insert_many(bets, ordered=False)
+            )
+            
+            # Mixed insert + update sequence pipelined in one bulk_write
+            operations = [InsertOne(game) for game in games]
+            operations += [
+                UpdateOne({"game_id": gid}, {"$set": {"had_predictions": True}, "$inc": {"side_bets_placed": 1}})
+                for gid in game_ids
+            ]
+            result = await self.games.bulk_write(operations, ordered=True)
+            
+            assert result.inserted_count == n_games, f"Expected {n_games} games inserted"
+            assert result.modified_count == n_games, f"Expected {n_games} games updated"
+            
+            bulk_range = prefix_range("test_bulk_")
+            pred_count, bet_count = await asyncio.gather(
+                self.predictions.count_documents({"game_id": bulk_range}),
+                self.side_bets.count_documents({"game_id": bulk_range})
+            )
+            assert pred_count == n_games, "All predictions should be saved"
+            assert bet_count == n_games, "All side bets should be saved"
+            
+            self.test_results.append((test_name, "PASSED"))
+            logger.info(f"✓ {test_name}: PASSED")
+            return True
+            
+        except AssertionError as e:
+            self.test_results.append((test_name, f"FAILED: {e}"))
+            logger.error(f"✗ {test_name}: {e}")
+            return False
+        except Exception as e:
+            self.test_results.append((test_name, f"ERROR: {e}"))
+            logger.error(f"✗ {test_name}: Unexpected error: {e}")
+            return False
     
     async def test_rollback(self):
         """Test that rollback works correctly"""
         test_name = "Rollback Safety"
+        # Rollback is driven by the environment flag itself, so this test
+        # toggles it and puts the original value back when done
+        original = os.environ.get("PERSISTENCE_ENABLED")
         try:
-            # Start with enabled
             os.environ["PERSISTENCE_ENABLED"] = "true"
             
-            from repositories.game_repository import GameRepository
-            from models.storage import GameRecord
-            
             repo1 = GameRepository(self.db)
             assert repo1.persistence_enabled is True, "Should start enabled"
             
@@ -273,7 +372,7 @@ class PersistenceTestSuite:
             assert result2 is None, "Should not save when disabled"
             
             # Verify only first game was saved
-            count = await self.db.games.count_documents({"game_id": {"$regex": "^test_rollback_"}})
+            count = await self.games.count_documents({"game_id": prefix_range("test_rollback_")})
             assert count == 1, "Only first game should be saved"
             
             self.test_results.append((test_name, "PASSED"))
@@ -288,6 +387,11 @@ class PersistenceTestSuite:
             self.test_results.append((test_name, f"ERROR: {e}"))
             logger.error(f"✗ {test_name}: Unexpected error: {e}")
             return False
+        finally:
+            if original is None:
+                os.environ.pop("PERSISTENCE_ENABLED", None)
+            else:
+                os.environ["PERSISTENCE_ENABLED"] = original
     
     async def run_all_tests(self):
         """Run all tests"""
@@ -299,11 +403,19 @@ class PersistenceTestSuite:
             logger.error("Setup failed - cannot run tests")
             return False
         
-        # Run tests
-        await self.test_persistence_disabled()
-        await self.test_persistence_enabled()
-        await self.test_integration()
-        await self.test_rollback()
+        # Run tests concurrently; each uses its own game_id prefix
+        results = await asyncio.gather(
+            self.test_persistence_disabled(),
+            self.test_persistence_enabled(),
+            self.test_integration(),
+            self.test_bulk_insert(),
+            return_exceptions=True
+        )
+        # The rollback test flips PERSISTENCE_ENABLED, so it runs on its own
+        results.extend(await asyncio.gather(self.test_rollback(), return_exceptions=True))
+        for result in results:
+            if isinstance(result, BaseException):
+                self.test_results.append(("Test dispatch", f"ERROR: {result}"))
         
         # Cleanup
         await self.cleanup()
@@ -336,13 +448,21 @@ class PersistenceTestSuite:
             return False
 
 
-async def main():
+async def main(fresh: bool = False):
     """Main test runner"""
-    test_suite = PersistenceTestSuite()
+    test_suite = PersistenceTestSuite(fresh=fresh)
     success = await test_suite.run_all_tests()
     return 0 if success else 1
 
 
 if __name__ == "__main__":
-    exit_code = asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Test TED persistence system")
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Drop the test database before running"
+    )
+    args = parser.parse_args()
+    
+    exit_code = asyncio.run(main(fresh=args.fresh))
     sys.exit(exit_code)
\ No newline at end of file
@@ -4,12 +4,24 @@ Quick verification script to check if persistence is properly set up.
 Run this before starting the server to verify configuration.
 """
 
+import asyncio
+import functools
+import importlib
+import importlib.util
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# Add backend to path
-sys.path.append(str(Path(__file__).parent.parent / "backend"))
+# Add backend to path (once, even if this module is imported again)
+_BACKEND = str(Path(__file__).resolve().parent.parent / "backend")
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+@functools.lru_cache(maxsize=None)
+def _env(name, default=None):
+    """Read an environment variable once; call _env.cache_clear() after mutating os.environ"""
+    return os.getenv(name, default)
 
 def check_environment():
     """Check environment variables"""
@@ -26,7 +38,7 @@ def check_environment():
     
     all_good = True
     for var, desc in vars_to_check:
-        value = os.getenv(var, "NOT SET")
+        value = _env(var, "NOT SET")
         if value == "NOT SET":
             print(f"❌ {var}: NOT SET ({desc})")
             all_good = False
@@ -40,6 +52,16 @@ def check_environment():
     
     return all_good
 
+def _try_import(module):
+    """Import a module, returning (module, ok, error); missing modules skip the import"""
+    try:
+        if importlib.util.find_spec(module) is None:
+            return module, False, f"No module named '{module}'"
+        importlib.import_module(module)
+        return module, True, None
+    except ImportError as e:
+        return module, False, str(e)
+
 def check_imports():
     """Check if all required modules can be imported"""
     print("\n📦 Module Imports:")
@@ -52,69 +74,79 @@ def check_imports():
         ("persistence_integration", "Integration module"),
     ]
     
+    # Imports overlap their file I/O in threads; results print in list order
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(_try_import, [module for module, _ in modules_to_check]))
+    
     all_good = True
-    for module, desc in modules_to_check:
-        try:
-            __import__(module)
+    for (module, ok, error), (_, desc) in zip(results, modules_to_check):
+        if ok:
             print(f"✓ {module}: OK ({desc})")
-        except ImportError as e:
+        else:
             print(f"❌ {module}: FAILED ({desc})")
-            print(f"   Error: {e}")
+            print(f"   Error: {error}")
             all_good = False
     
     return all_good
 
-def check_mongodb_connection():
-    """Check MongoDB connection"""
-    print("\n🗄️  MongoDB Connection:")
-    print("-" * 40)
-    
+def _check_mongo(client):
+    """Check MongoDB liveness; list databases only when ours has no collections yet"""
+    db_name = _env("DB_NAME", "rugs_tracker")
+    db = client[db_name]
     try:
-        from motor.motor_asyncio import AsyncIOMotorClient
-        import asyncio
-        
-        async def test_connection():
-            mongo_url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-            client = AsyncIOMotorClient(mongo_url)
-            
-            try:
-                # Ping the server
-                await client.admin.command('ping')
-                print(f"✓ MongoDB connection successful")
-                
-                # List databases
-                dbs = await client.list_database_names()
-                print(f"✓ Available databases: {', '.join(dbs[:5])}")
-                
-                # Check our database
-                db_name = os.getenv("DB_NAME", "rugs_tracker")
-                if db_name in dbs:
-                    db = client[db_name]
-                    collections = await db.list_collection_names()
-                    print(f"✓ Database '{db_name}' exists with {len(collections)} collections")
-                else:
-                    print(f"ℹ️  Database '{db_name}' does not exist yet (will be created)")
-                
-                client.close()
-                return True
-                
-            except Exception as e:
-                print(f"❌ MongoDB connection failed: {e}")
-                client.close()
-                return False
-        
-        return asyncio.run(test_connection())
-        
+        client.admin.command('ping')
+        # Per-db ping plus a names-only collection listing; no catalog-wide listDatabases
+        db.command('ping')
+        collections = db.list_collection_names(nameOnly=True, authorizedCollections=True)
+        dbs = None if collections else client.list_database_names()
     except Exception as e:
-        print(f"❌ Could not test MongoDB: {e}")
+        print("\n🗄️  MongoDB Connection:")
+        print("-" * 40)
+        print(f"❌ MongoDB connection failed: {e}")
         return False
+    
+    lines = ["✓ MongoDB connection successful"]
+    
+    # Check our database
+    if collections:
+        lines.append(f"✓ Database '{db_name}' exists with {len(collections)} collections")
+    else:
+        lines.append(f"✓ Available databases: {', '.join(dbs[:5])}")
+        lines.append(f"ℹ️  Database '{db_name}' does not exist yet (will be created)")
+    
+    print("\n🗄️  MongoDB Connection:")
+    print("-" * 40)
+    print("\n".join(lines))
+    return True
+
+def _mongo_client():
+    """Build the single MongoClient shared by every Mongo-backed check"""
+    from pymongo import MongoClient
+    return MongoClient(
+        _env("MONGO_URL", "mongodb://localhost:27017"),
+        maxPoolSize=10,
+        minPoolSize=1,
+        serverSelectionTimeoutMS=2000,
+        connectTimeoutMS=2000,
+        socketTimeoutMS=5000,
+        appname="ted-verify"
+    )
+
+def check_mongodb_connection(client, client_error=None):
+    """Check MongoDB connection (one-shot probe, so plain pymongo rather than Motor)"""
+    if client is None:
+        print("\n🗄️  MongoDB Connection:")
+        print("-" * 40)
+        print(f"❌ Could not test MongoDB: {client_error}")
+        return False
+    return _check_mongo(client)
 
 def check_persistence_status():
     """Check persistence system status"""
     print("\n⚙️  Persistence System Status:")
     print("-" * 40)
     
-    enabled = os.getenv("PERSISTENCE_ENABLED", "false").lower() == "true"
+    enabled = _env("PERSISTENCE_ENABLED", "false").lower() == "true"
     
     if enabled:
         print("✓ Persistence is ENABLED")
@@ -129,7 +161,7 @@ def check_persistence_status():
     
     return True
 
-def main():
+async def main():
     """Main verification"""
     print("=" * 50)
     print("TED System - Persistence Setup Verification")
@@ -137,10 +169,20 @@ def main():
     
     checks = []
     
-    # Run checks
+    # Local checks first; the blocking Mongo probe runs in a worker thread
     checks.append(("Environment", check_environment()))
     checks.append(("Imports", check_imports()))
-    checks.append(("MongoDB", check_mongodb_connection()))
+    client, client_error = None, None
+    try:
+        client = _mongo_client()
+    except Exception as e:
+        client_error = e
+    try:
+        mongo_ok = await asyncio.to_thread(check_mongodb_connection, client, client_error)
+    finally:
+        if client is not None:
+            client.close()
+    checks.append(("MongoDB", mongo_ok))
     checks.append(("Status", check_persistence_status()))
     
     # Summary
@@ -173,4 +215,4 @@ def main():
         return 1
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
@@ -5,22 +5,73 @@ Tests both enabled and disabled states without complex imports.
 """
 
 import asyncio
+import contextlib
 import os
 import sys
 from pathlib import Path
 
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent / "backend"))
+# Add backend to path (once, even if this module is imported again)
+_BACKEND = Path(__file__).resolve().parent / "backend"
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
 
-# Load environment
-from dotenv import load_dotenv
-env_path = Path(__file__).parent / "backend" / ".env"
-load_dotenv(env_path)
+# Load environment once per process
+if not os.environ.get("_TED_DOTENV_LOADED"):
+    from dotenv import load_dotenv
+    load_dotenv(_BACKEND / ".env")
+    os.environ["_TED_DOTENV_LOADED"] = "1"
+
+# Snapshot connection settings once; PERSISTENCE_ENABLED is toggled per test
+# and is read fresh by GameRepository, so it is deliberately not cached here
+MONGO_URL = os.getenv("MONGO_URL")
 
 print("=" * 60)
 print("TED Persistence System - Simple Test")
 print("=" * 60)
 
+# Shared Motor client for every test phase (built lazily, closed in main)
+_client = None
+
+async def get_client():
+    """Return the shared client, creating and warming its pool on first use"""
+    global _client
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        _client = AsyncIOMotorClient(
+            MONGO_URL,
+            maxPoolSize=20,
+            minPoolSize=2,
+            maxIdleTimeMS=300000
+        )
+        await _client.admin.command('ping')
+    return _client
+
+@contextlib.contextmanager
+def _env_override(**overrides):
+    """Temporarily set environment variables, restoring previous values on exit"""
+    old = {key: os.environ.get(key) for key in overrides}
+    os.environ.update({key: str(value) for key, value in overrides.items()})
+    try:
+        yield
+    finally:
+        for key, value in old.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+# Game ids created by the tests; cleanup matches them with an indexed $in
+# instead of scanning the collection with a regex
+_test_game_ids = set()
+
+async def _cleanup(db, game_ids):
+    """Delete test games and their predictions in one overlapped round-trip"""
+    query = {"game_id": {"$in": list(game_ids)}}
+    await asyncio.gather(
+        db.games.delete_many(query),
+        db.predictions.delete_many(query)
+    )
+
 async def test_disabled():
     """Test with persistence disabled"""
     print("\n1. Testing with PERSISTENCE_ENABLED=false")
@@ -30,10 +81,9 @@ async def test_disabled():
     
     from repositories.game_repository import GameRepository
     from models.storage import GameRecord
-    from motor.motor_asyncio import AsyncIOMotorClient
     
     # Connect to MongoDB
-    client = AsyncIOMotorClient(os.getenv("MONGO_URL"))
+    client = await get_client()
     db = client["rugs_tracker_test"]
     
     # Create repository
@@ -62,7 +112,6 @@ async def test_disabled():
     else:
         print("✗ FAIL: Data was saved when it shouldn't be")
     
-    client.close()
     return result is None
 
 async def test_enabled():
@@ -74,10 +123,9 @@ async def test_enabled():
     
     from repositories.game_repository import GameRepository
     from models.storage import GameRecord, PredictionRecord
-    from motor.motor_asyncio import AsyncIOMotorClient
     
     # Connect to MongoDB
-    client = AsyncIOMotorClient(os.getenv("MONGO_URL"))
+    client = await get_client()
     db = client["rugs_tracker_test"]
     
     # Create repository
@@ -98,6 +146,7 @@ async def test_enabled():
         peak_tick=0
     )
     
+    _test_game_ids.add(game.game_id)
     result = await repo.save_game(game)
     print(f"  Save result: {result}")
     
@@ -120,15 +169,17 @@ async def test_enabled():
     pred_result = await repo.save_prediction(pred)
     print(f"✓ Prediction saved: {pred_result}")
     
-    # Update game end
-    await repo.update_game_end("test_enabled_001", 290, 5.2)
-    
-    # Update prediction outcome
-    await repo.update_prediction_outcome("test_enabled_001", 290)
+    # Update game end and prediction outcome (they $set disjoint fields)
+    await asyncio.gather(
+        repo.update_game_end("test_enabled_001", 290, 5.2),
+        repo.update_prediction_outcome("test_enabled_001", 290)
+    )
     
     # Check updates
-    updated_game = await db.games.find_one({"game_id": "test_enabled_001"})
-    updated_pred = await db.predictions.find_one({"game_id": "test_enabled_001"})
+    updated_game, updated_pred = await asyncio.gather(
+        db.games.find_one({"game_id": "test_enabled_001"}),
+        db.predictions.find_one({"game_id": "test_enabled_001"})
+    )
     
     if updated_game and updated_game.get("end_tick") == 290:
         print(f"✓ Game end updated: tick {updated_game['end_tick']}")
@@ -137,10 +188,8 @@ async def test_enabled():
         print(f"✓ Prediction metrics calculated: E40 = {updated_pred['error_metrics']['e40']}")
     
     # Cleanup test data
-    await db.games.delete_many({"game_id": {"$regex": "^test_"}})
-    await db.predictions.delete_many({"game_id": {"$regex": "^test_"}})
+    await _cleanup(db, _test_game_ids)
     
-    client.close()
     return saved_game is not None
 
 async def test_rollback():
@@ -150,39 +199,38 @@ async def test_rollback():
     
     from repositories.game_repository import GameRepository
     from models.storage import GameRecord
-    from motor.motor_asyncio import AsyncIOMotorClient
     
-    client = AsyncIOMotorClient(os.getenv("MONGO_URL"))
+    client = await get_client()
     db = client["rugs_tracker_test"]
     
     # Start enabled
-    os.environ["PERSISTENCE_ENABLED"] = "true"
-    repo1 = GameRepository(db)
+    with _env_override(PERSISTENCE_ENABLED="true"):
+        repo1 = GameRepository(db)
     print(f"  Initial state: Enabled = {repo1.persistence_enabled}")
     
     # Save a game
     game1 = GameRecord(game_id="test_rollback_001", start_tick=0, peak_price=1.0, peak_tick=0)
+    _test_game_ids.add(game1.game_id)
     result1 = await repo1.save_game(game1)
     print(f"  Saved game while enabled: {result1}")
     
     # Simulate rollback
-    os.environ["PERSISTENCE_ENABLED"] = "false"
-    repo2 = GameRepository(db)
+    with _env_override(PERSISTENCE_ENABLED="false"):
+        repo2 = GameRepository(db)
     print(f"  After rollback: Enabled = {repo2.persistence_enabled}")
     
     # Try to save another game
     game2 = GameRecord(game_id="test_rollback_002", start_tick=0, peak_price=1.0, peak_tick=0)
+    _test_game_ids.add(game2.game_id)
     result2 = await repo2.save_game(game2)
     print(f"  Save attempt after rollback: {result2}")
     
     # Check what's in DB
-    count = await db.games.count_documents({"game_id": {"$regex": "^test_rollback_"}})
+    count = await db.games.count_documents({"game_id": {"$in": [game1.game_id, game2.game_id]}})
     print(f"  Games in DB: {count}")
     
     # Cleanup
-    await db.games.delete_many({"game_id": {"$regex": "^test_rollback_"}})
-    
-    client.close()
+    await _cleanup(db, _test_game_ids)
     
     if count == 1 and result2 is None:
         print("✓ PASS: Rollback works correctly")
@@ -210,6 +258,9 @@ async def main():
         import traceback
         traceback.print_exc()
         return False
+    finally:
+        if _client is not None:
+            _client.close()
     
     # Summary
     print("\n" + "=" * 60)
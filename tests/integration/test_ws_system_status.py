@@ -4,23 +4,27 @@ WebSocket System Status Test
 Specifically tests that WS clients receive payload with system_status as requested
 """
 
-import websocket
-import json
-import time
-import threading
+import asyncio
+import orjson
+import sys
+from itertools import islice
+import websockets
 
 class WebSocketSystemStatusTester:
-    def __init__(self, base_url="https://pattern-prophet-2.preview.emergentagent.com"):
+    def __init__(self, base_url="https://pattern-prophet-2.preview.emergentagent.com", timeout=15,
+                 verbose=False):
         self.base_url = base_url
+        self.timeout = timeout
+        self.verbose = verbose
         self.ws_messages = []
         self.ws_connected = False
         self.ws_error = None
         self.system_status_received = False
 
-    def on_ws_message(self, ws, message):
+    def on_ws_message(self, message):
         """WebSocket message handler"""
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
             self.ws_messages.append(data)
             
             # Check for system_status in the payload
@@ -32,71 +36,63 @@ class WebSocketSystemStatusTester:
                 print(f"   - uptime_seconds: {system_status.get('uptime_seconds')}")
                 print(f"   - total_games: {system_status.get('total_games')}")
                 print(f"   - version: {system_status.get('version')}")
-            else:
-                # Check what keys are present
-                keys = list(data.keys()) if isinstance(data, dict) else []
-                print(f"📨 Received message with keys: {keys[:5]}...")
+            elif self.verbose:
+                # Sample the first few keys without materializing the full list
+                keys = list(islice(data, 5)) if isinstance(data, dict) else []
+                print(f"📨 Received message with keys: {keys}...")
                 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             print(f"📨 Received raw message: {message[:100]}...")
 
-    def on_ws_error(self, ws, error):
+    def on_ws_error(self, error):
         """WebSocket error handler"""
         self.ws_error = str(error)
         print(f"❌ WebSocket error: {error}")
 
-    def on_ws_close(self, ws, close_status_code, close_msg):
+    def on_ws_close(self, close_status_code, close_msg):
         """WebSocket close handler"""
         print(f"🔌 WebSocket closed: {close_status_code} - {close_msg}")
 
-    def on_ws_open(self, ws):
+    def on_ws_open(self):
         """WebSocket open handler"""
         self.ws_connected = True
         print("🔗 WebSocket connected - waiting for initial payload...")
 
-    def test_system_status_payload(self):
+    async def _wait_for_system_status(self, ws):
+        """Consume frames until one carries system_status"""
+        while not self.system_status_received:
+            self.on_ws_message(await ws.recv())
+
+    async def test_system_status_payload(self):
         """Test that WebSocket receives payload with system_status"""
         try:
             ws_url = self.base_url.replace('https://', 'wss://').replace('http://', 'ws://') + '/api/ws'
             print(f"🔌 Connecting to WebSocket: {ws_url}")
             print("🎯 Looking for system_status in initial payload...")
             
-            ws = websocket.WebSocketApp(
-                ws_url,
-                on_open=self.on_ws_open,
-                on_message=self.on_ws_message,
-                on_error=self.on_ws_error,
-                on_close=self.on_ws_close
-            )
-            
-            # Run WebSocket in a separate thread
-            ws_thread = threading.Thread(target=ws.run_forever)
-            ws_thread.daemon = True
-            ws_thread.start()
+            try:
+                async with websockets.connect(ws_url, open_timeout=self.timeout) as ws:
+                    self.on_ws_open()
+                    try:
+                        # Returns as soon as the frame arrives rather than on a polling tick
+                        await asyncio.wait_for(self._wait_for_system_status(ws), timeout=self.timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                self.on_ws_close(ws.close_code, ws.close_reason)
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                self.on_ws_error(e)
             
-            # Wait for connection and system_status
-            timeout = 15
-            start_time = time.time()
+            if self.system_status_received:
+                print("✅ SUCCESS: system_status payload received!")
+                return True
             
-            while time.time() - start_time < timeout:
-                if self.ws_error:
-                    ws.close()
-                    print(f"❌ Connection error: {self.ws_error}")
-                    return False
-                
-                if self.system_status_received:
-                    ws.close()
-                    print("✅ SUCCESS: system_status payload received!")
-                    return True
-                
-                time.sleep(0.5)
-            
-            ws.close()
-            
-            if not self.ws_connected:
+            if self.ws_error:
+                print(f"❌ Connection error: {self.ws_error}")
+                return False
+            elif not self.ws_connected:
                 print("❌ FAILED: Could not connect to WebSocket")
                 return False
-            elif not self.system_status_received:
+            else:
                 print("❌ FAILED: No system_status found in initial payload")
                 print(f"   Received {len(self.ws_messages)} messages total")
                 if self.ws_messages:
@@ -112,8 +108,8 @@ def main():
     print("🚀 Testing WebSocket system_status payload...")
     print("=" * 50)
     
-    tester = WebSocketSystemStatusTester()
-    success = tester.test_system_status_payload()
+    tester = WebSocketSystemStatusTester(verbose="--verbose" in sys.argv)
+    success = asyncio.run(tester.test_system_status_payload())
     
     print("=" * 50)
     if success:
@@ -124,5 +120,4 @@ def main():
         return 1
 
 if __name__ == "__main__":
-    import sys
     sys.exit(main())
\ No newline at end of file
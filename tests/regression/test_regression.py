@@ -3,109 +3,91 @@
 Specific regression test for review request requirements
 """
 
+import asyncio
+from pathlib import Path
 import requests
-import websocket
-import json
-import time
-import threading
+import websockets
+import orjson
 
-def test_prediction_history_schema():
-    """Test that WebSocket initial payload includes prediction_history array with end_price fields"""
-    base_url = "https://pattern-prophet-2.preview.emergentagent.com"
-    ws_url = base_url.replace('https://', 'wss://') + '/api/ws'
-    
-    messages = []
-    connected = False
-    error = None
-    
-    def on_message(ws, message):
-        try:
-            data = json.loads(message)
-            messages.append(data)
+BASE_URL = "https://pattern-prophet-2.preview.emergentagent.com"
+
+# ETags from previous runs, keyed by URL, so repeat runs can get 304s
+ETAG_CACHE_PATH = Path.home() / ".cache" / "ted_regression_etag.json"
+
+def _load_etags():
+    try:
+        return orjson.loads(ETAG_CACHE_PATH.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+def _save_etags(etags):
+    try:
+        ETAG_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        ETAG_CACHE_PATH.write_bytes(orjson.dumps(etags))
+    except OSError:
+        pass
+
+def _conditional_get(session, url, etags):
+    """GET with If-None-Match when a cached ETag exists"""
+    headers = {"If-None-Match": etags[url]} if url in etags else {}
+    return session.get(url, headers=headers, timeout=10)
+
+def _record_result(etags, url, response, passed):
+    """Cache the ETag of a validated 200 body; forget it on failure so the next run re-checks"""
+    if not passed:
+        etags.pop(url, None)
+    elif response.status_code == 200 and response.headers.get("ETag"):
+        etags[url] = response.headers["ETag"]
+
+async def _wait_for_prediction_history(ws_url):
+    """Read WebSocket messages until one carries prediction_history"""
+    async with websockets.connect(ws_url) as ws:
+        print("🔗 WebSocket connected")
+        async for raw in ws:
+            try:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                continue
+            if not isinstance(data, dict):
+                continue
             print(f"📨 Received message with keys: {list(data.keys())}")
-            
-            # Check for prediction_history
             if 'prediction_history' in data:
-                pred_history = data['prediction_history']
-                print(f"📊 prediction_history found: {len(pred_history)} records")
-                
-                # Check for end_price fields in records
-                if pred_history and len(pred_history) > 0:
-                    first_record = pred_history[0]
-                    print(f"📋 First record keys: {list(first_record.keys())}")
-                    
-                    if 'end_price' in first_record:
-                        print(f"✅ end_price field found: {first_record['end_price']}")
-                    else:
-                        print(f"❌ end_price field missing from prediction_history records")
-                else:
-                    print(f"📋 prediction_history is empty")
-                    
-        except json.JSONDecodeError:
-            messages.append(message)
-    
-    def on_error(ws, error_msg):
-        nonlocal error
-        error = str(error_msg)
-        print(f"❌ WebSocket error: {error_msg}")
-    
-    def on_open(ws):
-        nonlocal connected
-        connected = True
-        print("🔗 WebSocket connected")
-    
-    def on_close(ws, close_status_code, close_msg):
-        print(f"🔌 WebSocket closed: {close_status_code}")
-    
-    print(f"🔌 Connecting to WebSocket: {ws_url}")
-    
-    ws = websocket.WebSocketApp(
-        ws_url,
-        on_open=on_open,
-        on_message=on_message,
-        on_error=on_error,
-        on_close=on_close
-    )
-    
-    # Run WebSocket in a separate thread
-    ws_thread = threading.Thread(target=ws.run_forever)
-    ws_thread.daemon = True
-    ws_thread.start()
-    
-    # Wait for messages
+                return data['prediction_history']
+    return None
+
+def test_prediction_history_schema():
+    """Test that WebSocket initial payload includes prediction_history array with end_price fields"""
+    ws_url = BASE_URL.replace('https://', 'wss://') + '/api/ws'
     timeout = 15
-    start_time = time.time()
     
-    while time.time() - start_time < timeout:
-        if error:
-            print(f"❌ Connection failed: {error}")
-            return False
-            
-        if connected and messages:
-            # Look for initial payload with prediction_history
-            for msg in messages:
-                if isinstance(msg, dict) and 'prediction_history' in msg:
-                    pred_history = msg['prediction_history']
-                    if pred_history and len(pred_history) > 0:
-                        # Check if records have end_price
-                        has_end_price = any('end_price' in record for record in pred_history)
-                        if has_end_price:
-                            print("✅ REGRESSION TEST PASSED: prediction_history contains end_price fields")
-                            ws.close()
-                            return True
-                        else:
-                            print("❌ REGRESSION TEST FAILED: prediction_history records missing end_price fields")
-                            ws.close()
-                            return False
-                    else:
-                        print("📋 prediction_history is empty - this is acceptable")
-                        ws.close()
-                        return True
-        
-        time.sleep(0.5)
+    print(f"🔌 Connecting to WebSocket: {ws_url}")
     
-    ws.close()
-    print("⏰ Timeout waiting for prediction_history")
+    try:
+        pred_history = asyncio.run(asyncio.wait_for(_wait_for_prediction_history(ws_url), timeout=timeout))
+    except asyncio.TimeoutError:
+        print("⏰ Timeout waiting for prediction_history")
+        return False
+    except Exception as e:
+        print(f"❌ Connection failed: {e}")
+        return False
+    
+    if pred_history is None:
+        print("🔌 WebSocket closed before prediction_history arrived")
+        return False
+    
+    print(f"📊 prediction_history found: {len(pred_history)} records")
+    if not pred_history:
+        print("📋 prediction_history is empty - this is acceptable")
+        return True
+    
+    print(f"📋 First record keys: {list(pred_history[0].keys())}")
+    
+    # Check if records have end_price
+    has_end_price = any('end_price' in record for record in pred_history)
+    if has_end_price:
+        print("✅ REGRESSION TEST PASSED: prediction_history contains end_price fields")
+        return True
+    print("❌ REGRESSION TEST FAILED: prediction_history records missing end_price fields")
     return False
 
 def main():
@@ -113,13 +95,22 @@ def main():
     print("🚀 Running Regression Test for Review Request")
     print("=" * 50)
     
+    session = requests.Session()
+    etags = _load_etags()
+    
     # Test 1: Health endpoint
     print("1) Testing GET /api/health for version 2.0.0...")
+    url = f"{BASE_URL}/api/health"
+    response, passed = None, False
     try:
-        response = requests.get("https://pattern-prophet-2.preview.emergentagent.com/api/health", timeout=10)
-        if response.status_code == 200:
+        response = _conditional_get(session, url, etags)
+        if response.status_code == 304:
+            passed = True
+            print("✅ Health endpoint: PASSED (not modified)")
+        elif response.status_code == 200:
             data = response.json()
             if data.get('status') == 'healthy' and data.get('version') == '2.0.0':
+                passed = True
                 print("✅ Health endpoint: PASSED")
             else:
                 print(f"❌ Health endpoint: FAILED - Status: {data.get('status')}, Version: {data.get('version')}")
@@ -127,16 +118,23 @@ def main():
             print(f"❌ Health endpoint: FAILED - Status code: {response.status_code}")
     except Exception as e:
         print(f"❌ Health endpoint: ERROR - {e}")
+    _record_result(etags, url, response, passed)
     
     # Test 2: Status endpoint
     print("\n2) Testing GET /api/status for required sections...")
+    url = f"{BASE_URL}/api/status"
+    response, passed = None, False
     try:
-        response = requests.get("https://pattern-prophet-2.preview.emergentagent.com/api/status", timeout=10)
-        if response.status_code == 200:
+        response = _conditional_get(session, url, etags)
+        if response.status_code == 304:
+            passed = True
+            print("✅ Status endpoint: PASSED (not modified)")
+        elif response.status_code == 200:
             data = response.json()
             required_sections = ['system', 'connections', 'statistics', 'ml', 'side_bet_performance']
             missing = [s for s in required_sections if s not in data]
             if not missing:
+                passed = True
                 print("✅ Status endpoint: PASSED - All required sections present")
             else:
                 print(f"❌ Status endpoint: FAILED - Missing sections: {missing}")
@@ -144,6 +142,10 @@ def main():
             print(f"❌ Status endpoint: FAILED - Status code: {response.status_code}")
     except Exception as e:
         print(f"❌ Status endpoint: ERROR - {e}")
+    _record_result(etags, url, response, passed)
+    
+    session.close()
+    _save_etags(etags)
     
     # Test 3: WebSocket prediction_history schema
     print("\n3) Testing WebSocket /api/ws for prediction_history with end_price...")
@@ -4,103 +4,135 @@ Smoke test for side-bet patch - verifies the patch was applied correctly
 by checking for the presence of new functions and constants.
 """
 
+import mmap
 import os
 import re
 
-def check_file_contains(filepath, pattern, description):
-    """Check if a file contains a specific pattern"""
-    try:
-        with open(filepath, 'r') as f:
-            content = f.read()
-            if re.search(pattern, content):
-                print(f"✅ {description}: FOUND")
-                return True
-            else:
-                print(f"❌ {description}: NOT FOUND")
-                return False
-    except Exception as e:
-        print(f"❌ {description}: ERROR - {e}")
-        return False
+_RAW_CHECKS = [
+    # Check game_aware_ml_engine.py for side_bet_signal method
+    ("backend/game_aware_ml_engine.py", 
+     r"def side_bet_signal\(self.*current_tick.*current_price.*peak_price",
+     "Hazard-based side_bet_signal method"),
+    
+    # Check server.py for environment constants
+    ("backend/server.py",
+     r"SIDEBET_WINDOW_TICKS.*=.*int\(os\.getenv",
+     "SIDEBET_WINDOW_TICKS constant"),
+    
+    ("backend/server.py",
+     r"SIDEBET_COOLDOWN_TICKS.*=.*int\(os\.getenv",
+     "SIDEBET_COOLDOWN_TICKS constant"),
+    
+    ("backend/server.py",
+     r"SIDEBET_PWIN_THRESHOLD.*=.*float\(os\.getenv",
+     "SIDEBET_PWIN_THRESHOLD constant"),
+    
+    # Check for tolerance quantization
+    ("backend/server.py",
+     r"def _quantize_prediction_tolerance\(self.*prediction.*current_tick",
+     "Tolerance quantization helper"),
+    
+    # Check for gating state
+    ("backend/server.py",
+     r"self\.last_side_bet_tick.*=.*None",
+     "Gating state: last_side_bet_tick"),
+    
+    ("backend/server.py",
+     r"self\.last_side_bet_active_until.*=.*None",
+     "Gating state: last_side_bet_active_until"),
+    
+    # Check for updated side bet history size
+    ("backend/server.py",
+     r"self\.side_bet_history.*=.*deque\(maxlen=200\)",
+     "Side bet history increased to 200"),
+    
+    # Check for new side bet logic in process_game_update
+    ("backend/server.py",
+     r"side_bet.*=.*self\.ml_engine\.side_bet_signal",
+     "New hazard-based side bet call"),
+    
+    # Check for corrected win evaluation
+    ("backend/server.py",
+     r"placed_at.*=.*bet\.get\('tick'",
+     "Relative placement time for win evaluation"),
+    
+    # Check for updated REST endpoint
+    ("backend/server.py",
+     r"side_bet.*=.*pattern_tracker\.ml_engine\.side_bet_signal",
+     "Updated REST endpoint to use new signal"),
+    
+    # Check for coverage fields in tolerance
+    ("backend/server.py",
+     r'prediction\["coverage_lower"\].*=.*lower',
+     "Coverage lower bound calculation"),
+    
+    ("backend/server.py",
+     r'prediction\["coverage_windows"\].*=.*windows',
+     "Coverage windows calculation"),
+]
+
+def _compile_file_scans(checks):
+    """Group compiled checks by file and build one combined named-group pattern per file"""
+    groups = {}
+    for idx, (filepath, pattern, _) in enumerate(checks):
+        groups.setdefault(filepath, []).append((idx, pattern))
+    return {
+        filepath: (
+            re.compile(b"|".join(b"(?P<c%d>%s)" % (idx, pattern.pattern) for idx, pattern in group), re.M),
+            group,
+        )
+        for filepath, group in groups.items()
+    }
+
+# Compiled once at import rather than on every search
+CHECKS = [(filepath, re.compile(pattern.encode(), re.M), description)
+          for filepath, pattern, description in _RAW_CHECKS]
+FILE_SCANS = _compile_file_scans(CHECKS)
+
+def scan_file(filepath, combined, patterns):
+    """Return the check indices found in a file, using one combined pass"""
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        found = {int(m.lastgroup[1:]) for m in combined.finditer(buf)}
+        # Alternation reports one pattern per match span; re-check only the misses
+        for idx, pattern in patterns:
+            if idx not in found and pattern.search(buf):
+                found.add(idx)
+    return found
+
+def report(description, found, error=None):
+    """Print one check result"""
+    if error is not None:
+        print(f"❌ {description}: ERROR - {error}")
+    elif found:
+        print(f"✅ {description}: FOUND")
+    else:
+        print(f"❌ {description}: NOT FOUND")
+    return found and error is None
 
 def main():
     print("\n" + "="*60)
     print("SIDE BET PATCH SMOKE TEST")
     print("="*60 + "\n")
     
-    checks = [
-        # Check game_aware_ml_engine.py for side_bet_signal method
-        ("backend/game_aware_ml_engine.py", 
-         r"def side_bet_signal\(self.*current_tick.*current_price.*peak_price",
-         "Hazard-based side_bet_signal method"),
-        
-        # Check server.py for environment constants
-        ("backend/server.py",
-         r"SIDEBET_WINDOW_TICKS.*=.*int\(os\.getenv",
-         "SIDEBET_WINDOW_TICKS constant"),
-        
-        ("backend/server.py",
-         r"SIDEBET_COOLDOWN_TICKS.*=.*int\(os\.getenv",
-         "SIDEBET_COOLDOWN_TICKS constant"),
-        
-        ("backend/server.py",
-         r"SIDEBET_PWIN_THRESHOLD.*=.*float\(os\.getenv",
-         "SIDEBET_PWIN_THRESHOLD constant"),
-        
-        # Check for tolerance quantization
-        ("backend/server.py",
-         r"def _quantize_prediction_tolerance\(self.*prediction.*current_tick",
-         "Tolerance quantization helper"),
-        
-        # Check for gating state
-        ("backend/server.py",
-         r"self\.last_side_bet_tick.*=.*None",
-         "Gating state: last_side_bet_tick"),
-        
-        ("backend/server.py",
-         r"self\.last_side_bet_active_until.*=.*None",
-         "Gating state: last_side_bet_active_until"),
-        
-        # Check for updated side bet history size
-        ("backend/server.py",
-         r"self\.side_bet_history.*=.*deque\(maxlen=200\)",
-         "Side bet history increased to 200"),
-        
-        # Check for new side bet logic in process_game_update
-        ("backend/server.py",
-         r"side_bet.*=.*self\.ml_engine\.side_bet_signal",
-         "New hazard-based side bet call"),
-        
-        # Check for corrected win evaluation
-        ("backend/server.py",
-         r"placed_at.*=.*bet\.get\('tick'",
-         "Relative placement time for win evaluation"),
-        
-        # Check for updated REST endpoint
-        ("backend/server.py",
-         r"side_bet.*=.*pattern_tracker\.ml_engine\.side_bet_signal",
-         "Updated REST endpoint to use new signal"),
-        
-        # Check for coverage fields in tolerance
-        ("backend/server.py",
-         r'prediction\["coverage_lower"\].*=.*lower',
-         "Coverage lower bound calculation"),
-        
-        ("backend/server.py",
-         r'prediction\["coverage_windows"\].*=.*windows',
-         "Coverage windows calculation"),
-    ]
+    found = set()
+    errors = {}
+    for filepath, (combined, patterns) in FILE_SCANS.items():
+        try:
+            found.update(scan_file(filepath, combined, patterns))
+        except Exception as e:
+            errors.update({idx: e for idx, _ in patterns})
     
     passed = 0
     failed = 0
     
-    for filepath, pattern, description in checks:
-        if check_file_contains(filepath, pattern, description):
+    for idx, (_, _, description) in enumerate(CHECKS):
+        if report(description, idx in found, errors.get(idx)):
             passed += 1
         else:
             failed += 1
     
     print("\n" + "="*60)
-    print(f"RESULTS: {passed}/{len(checks)} checks passed")
+    print(f"RESULTS: {passed}/{len(CHECKS)} checks passed")
     if failed == 0:
         print("🎉 All patch components verified successfully!")
     else:
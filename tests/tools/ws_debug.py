@@ -3,54 +3,50 @@
 Simple WebSocket test for debugging
 """
 
-import websocket
+import asyncio
 import json
-import time
-import threading
+import logging
+import sys
 
-def on_message(ws, message):
+import websockets
+
+WS_URL = "wss://b1c1de50-2b1c-474e-957d-d21bed1c5e3e.preview.emergentagent.com/api/ws"
+REPLY_TIMEOUT = 10
+
+def show(message):
     print(f"📨 Received: {message}")
     try:
         data = json.loads(message)
         print(f"📨 Parsed JSON: {data}")
-    except:
+        return data
+    except ValueError:
         print(f"📨 Raw message: {message}")
+        return None
 
-def on_error(ws, error):
-    print(f"❌ Error: {error}")
-
-def on_close(ws, close_status_code, close_msg):
-    print(f"🔌 Closed: {close_status_code} - {close_msg}")
+async def send_and_wait(ws, command, is_reply):
+    """Send a command and print frames until the reply arrives (no fixed sleeps)"""
+    print(f"📤 Sending {command}...")
+    await ws.send(command)
+    while True:
+        data = show(await asyncio.wait_for(ws.recv(), timeout=REPLY_TIMEOUT))
+        if isinstance(data, dict) and is_reply(data):
+            return data
 
-def on_open(ws):
-    print("🔗 Connected!")
-    
-    def send_messages():
-        time.sleep(1)
-        print("📤 Sending ping...")
-        ws.send('ping')
-        
-        time.sleep(2)
-        print("📤 Sending status...")
-        ws.send('status')
-        
-        time.sleep(5)
-        print("📤 Closing connection...")
-        ws.close()
-    
-    threading.Thread(target=send_messages).start()
+async def main(ws_url):
+    print(f"🔌 Connecting to: {ws_url}")
+    try:
+        async with websockets.connect(ws_url) as ws:
+            print("🔗 Connected!")
+            await send_and_wait(ws, 'ping', lambda d: d.get('type') == 'pong')
+            await send_and_wait(ws, 'status', lambda d: 'system' in d or 'connections' in d)
+            print("📤 Closing connection...")
+        print(f"🔌 Closed: {ws.close_code} - {ws.close_reason}")
+    except asyncio.TimeoutError:
+        print(f"❌ Error: no reply within {REPLY_TIMEOUT}s")
+    except Exception as e:
+        print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    websocket.enableTrace(True)
-    ws_url = "wss://b1c1de50-2b1c-474e-957d-d21bed1c5e3e.preview.emergentagent.com/api/ws"
-    print(f"🔌 Connecting to: {ws_url}")
-    
-    ws = websocket.WebSocketApp(
-        ws_url,
-        on_open=on_open,
-        on_message=on_message,
-        on_error=on_error,
-        on_close=on_close
-    )
-    
-    ws.run_forever()
\ No newline at end of file
+    if "--trace" in sys.argv:
+        logging.basicConfig(level=logging.DEBUG)
+    asyncio.run(main(WS_URL))
@@ -2,10 +2,10 @@
 Test Early-Peak Regime (EPR) functionality
 """
 
-import sys
 import os
 import math
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import pytest
 
 # Set test environment for EPR
 os.environ["EPR_EARLY_TICK_MAX"] = "120"
@@ -17,6 +17,27 @@ os.environ["EPR_HAZARD_DECAY_TAU"] = "120"
 os.environ["EPR_SPREAD_WIDE"] = "160"
 os.environ["EPR_QUANTILE_WIDE_SPREAD"] = "0.7"
 
+from backend.game_aware_ml_engine import GameAwareMLPatternEngine, EPRConfig
+from backend.enhanced_pattern_engine import EnhancedPatternEngine
+
+# EPR settings above, parsed once
+EPR_CFG = EPRConfig.from_env()
+
+@pytest.fixture(scope="module")
+def _shared_ml_engine():
+    """Build the engine pair once per module"""
+    return GameAwareMLPatternEngine(EnhancedPatternEngine(), epr_cfg=EPR_CFG)
+
+@pytest.fixture
+def ml_engine(_shared_ml_engine):
+    """Shared engine with EPR state reset so tests stay independent"""
+    _shared_ml_engine._init_epr()
+    return _shared_ml_engine
+
+# EPR scale sweep (scale_min=0.75, scale_max=1.0, tau=120) evaluated once
+_DTS = np.array([0, 10, 50, 100, 200, 500], dtype=np.float64)
+_SCALES = 0.75 + 0.25 * np.exp(-_DTS / 120.0)
+
 def test_epr_scale_bounds():
     """Test that EPR scale is within valid bounds"""
     from math import isfinite
@@ -34,37 +55,28 @@ def test_epr_scale_bounds():
     assert scale_min <= scale < 0.76, f"At large dt, scale should approach {scale_min}, got {scale}"
     
     # Test scale is always in valid range
-    for dt in [0, 10, 50, 100, 200, 500]:
-        scale = scale_min + (scale_max - scale_min) * math.exp(-dt / 120)
+    for dt, scale in zip(_DTS.tolist(), _SCALES.tolist()):
         assert 0.0 < scale <= 1.0 and isfinite(scale), f"Scale out of bounds at dt={dt}: {scale}"
-    
-    print("✅ EPR scale bounds: PASSED")
 
 def test_quantile_swap_logic():
     """Test that quantile selection uses higher values when appropriate"""
-    # Test case 1: Wide spread triggers higher quantile
-    spread = 200
-    epr_active = False
     spread_threshold = 160
     
-    qt = 0.7 if (spread > spread_threshold or epr_active) else 0.5
-    assert qt == 0.7, f"Wide spread should trigger qt=0.7, got {qt}"
-    
-    # Test case 2: EPR active triggers higher quantile
-    spread = 100
-    epr_active = True
-    
-    qt = 0.7 if (spread > spread_threshold or epr_active) else 0.5
-    assert qt == 0.7, f"EPR active should trigger qt=0.7, got {qt}"
-    
-    # Test case 3: Neither condition, use default
-    spread = 100
-    epr_active = False
-    
-    qt = 0.7 if (spread > spread_threshold or epr_active) else 0.5
-    assert qt == 0.5, f"Default should be qt=0.5, got {qt}"
-    
-    print("✅ Quantile swap logic: PASSED")
+    # Cases: wide spread, EPR active, neither
+    spreads = np.array([200, 100, 100])
+    epr_flags = np.array([False, True, False])
+    expected = np.array([0.7, 0.7, 0.5])
+    
+    qt = np.where((spreads > spread_threshold) | epr_flags, 0.7, 0.5)
+    np.testing.assert_array_equal(qt, expected)
+    
+    # Broadcast grid over (epr_active, spread): EPR rows always swap, others only when wide
+    spreads = np.arange(0, 300, 10)
+    epr_flags = np.array([True, False])[:, None]
+    qt = np.where((spreads > spread_threshold) | epr_flags, 0.7, 0.5)
+    assert qt.shape == (2, spreads.size)
+    assert (qt[0] == 0.7).all(), "EPR active should always trigger qt=0.7"
+    np.testing.assert_array_equal(qt[1], np.where(spreads > spread_threshold, 0.7, 0.5))
 
 def test_sidebet_threshold_bump():
     """Test that side-bet threshold increases when EPR is active"""
@@ -80,18 +92,9 @@ def test_sidebet_threshold_bump():
     epr_active = False
     thr = base_threshold + (epr_bump if epr_active else 0.0)
     assert thr == 0.20, f"EPR inactive should keep threshold at 0.20, got {thr}"
-    
-    print("✅ Side-bet threshold bump: PASSED")
 
-def test_epr_activation_logic():
+def test_epr_activation_logic(ml_engine):
     """Test EPR activation conditions"""
-    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
-    from game_aware_ml_engine import GameAwareMLPatternEngine
-    from enhanced_pattern_engine import EnhancedPatternEngine
-    
-    base_engine = EnhancedPatternEngine()
-    ml_engine = GameAwareMLPatternEngine(base_engine)
-    
     # Initialize EPR
     ml_engine._init_epr()
     assert not ml_engine._epr["active"], "EPR should start inactive"
@@ -115,18 +118,9 @@ def test_epr_activation_logic():
         print("⚠️  EPR activation test skipped (requires specific dynamics)")
     else:
         assert ml_engine._epr["active"], "EPR should be active after sustained early peak"
-    
-    print("✅ EPR activation logic: PASSED")
 
-def test_epr_hazard_scaling():
+def test_epr_hazard_scaling(ml_engine):
     """Test that EPR properly scales hazard"""
-    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
-    from game_aware_ml_engine import GameAwareMLPatternEngine
-    from enhanced_pattern_engine import EnhancedPatternEngine
-    
-    base_engine = EnhancedPatternEngine()
-    ml_engine = GameAwareMLPatternEngine(base_engine)
-    
     # Test without EPR active
     scale = ml_engine._epr_hazard_scale(100)
     assert scale == 1.0, "Without EPR, scale should be 1.0"
@@ -146,18 +140,9 @@ def test_epr_hazard_scaling():
     scale = ml_engine._epr_hazard_scale(170)  # 120 ticks later (dt=120)
     expected = 0.75 + 0.25 * math.exp(-1)  # ≈ 0.84
     assert abs(scale - expected) < 0.02, f"After 120 ticks, scale should be ~{expected:.2f}, got {scale}"
-    
-    print("✅ EPR hazard scaling: PASSED")
 
-def test_epr_in_predictions():
+def test_epr_in_predictions(ml_engine):
     """Test that EPR affects predictions appropriately"""
-    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
-    from game_aware_ml_engine import GameAwareMLPatternEngine
-    from enhanced_pattern_engine import EnhancedPatternEngine
-    
-    base_engine = EnhancedPatternEngine()
-    ml_engine = GameAwareMLPatternEngine(base_engine)
-    
     # Make prediction without EPR
     pred1 = ml_engine.predict_rug_timing(50, 2.0, 2.0)
     
@@ -172,18 +157,9 @@ def test_epr_in_predictions():
     # (longer expected survival due to hazard scaling)
     assert "predicted_tick" in pred2
     assert "epr_active_at_prediction" not in pred2 or isinstance(pred2.get("epr_active_at_prediction"), bool)
-    
-    print("✅ EPR in predictions: PASSED")
 
-def test_epr_side_bet_signal():
+def test_epr_side_bet_signal(ml_engine):
     """Test that EPR affects side-bet signals"""
-    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
-    from game_aware_ml_engine import GameAwareMLPatternEngine
-    from enhanced_pattern_engine import EnhancedPatternEngine
-    
-    base_engine = EnhancedPatternEngine()
-    ml_engine = GameAwareMLPatternEngine(base_engine)
-    
     # Get side-bet signal without EPR
     signal1 = ml_engine.side_bet_signal(50, 2.0, 2.0)
     assert "epr_active" in signal1
@@ -198,47 +174,3 @@ def test_epr_side_bet_signal():
     assert "epr_active" in signal2
     assert signal2["epr_active"] == True
     assert signal2["threshold_used"] == 0.22  # Base 0.20 + 0.02 bump
-    
-    print("✅ EPR side-bet signal: PASSED")
-
-def run_all_tests():
-    """Run all EPR tests"""
-    import traceback
-    
-    print("\n" + "="*60)
-    print("EPR (EARLY-PEAK REGIME) TESTS")
-    print("="*60 + "\n")
-    
-    tests = [
-        test_epr_scale_bounds,
-        test_quantile_swap_logic,
-        test_sidebet_threshold_bump,
-        test_epr_activation_logic,
-        test_epr_hazard_scaling,
-        test_epr_in_predictions,
-        test_epr_side_bet_signal,
-    ]
-    
-    passed = 0
-    failed = 0
-    
-    for test in tests:
-        try:
-            test()
-            passed += 1
-        except Exception as e:
-            print(f"❌ {test.__name__}: FAILED")
-            print(f"   Error: {e}")
-            if "--verbose" in sys.argv:
-                traceback.print_exc()
-            failed += 1
-    
-    print("\n" + "="*60)
-    print(f"RESULTS: {passed} passed, {failed} failed")
-    print("="*60)
-    
-    return failed == 0
-
-if __name__ == "__main__":
-    success = run_all_tests()
-    sys.exit(0 if success else 1)
\ No newline at end of file
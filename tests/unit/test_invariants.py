@@ -4,15 +4,24 @@ Tests ensure correctness of hazard-based sidebets, tolerance quantization,
 and proper win evaluation logic.
 """
 
-import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import pytest
 
 # Set test environment
 os.environ["SIDEBET_WINDOW_TICKS"] = "40"
 os.environ["SIDEBET_COOLDOWN_TICKS"] = "4"
 os.environ["SIDEBET_PWIN_THRESHOLD"] = "0.20"
 
+from backend.game_aware_ml_engine import GameAwareMLPatternEngine
+from backend.enhanced_pattern_engine import EnhancedPatternEngine
+from backend._sidebet_kernels import sidebet_ev
+
+@pytest.fixture(scope="module")
+def ml_engine():
+    """Build the engine pair once per module"""
+    return GameAwareMLPatternEngine(EnhancedPatternEngine())
+
 def test_win_eval_relative_to_placement():
     """Test that side bet win is evaluated relative to placement time"""
     placed_at = 6
@@ -39,8 +48,9 @@ def test_gating_spacing():
     # Coverage ends at placed + (window - 1)
     coverage_end = placed + (window - 1)
     
-    # Next eligible is after coverage + cooldown
+    # Next eligible is after coverage + cooldown, i.e. placed + window + cooldown
     next_eligible = coverage_end + cooldown + 1
+    assert next_eligible == placed + window + cooldown
     
     expected = 100 + 39 + 4 + 1  # = 144
     assert next_eligible == expected, f"Expected {expected}, got {next_eligible}"
@@ -78,28 +88,22 @@ def test_ev_threshold_logic():
     
     # Test case 1: p_win = 0.21 should trigger
     p_win = 0.21
-    ev = 4.0 * p_win - (1.0 - p_win)
+    ev = float(sidebet_ev(np.float64(p_win)))
     assert p_win > threshold, f"Should trigger: {p_win} > {threshold}"
     assert ev > 0, f"EV should be positive: {ev}"
     
     # Test case 2: p_win = 0.19 should not trigger  
     p_win = 0.19
-    ev = 4.0 * p_win - (1.0 - p_win)
+    ev = float(sidebet_ev(np.float64(p_win)))
     assert p_win <= threshold, f"Should not trigger: {p_win} <= {threshold}"
     
     # Break-even point: p_win = 0.20 => EV = 0
     p_win = 0.20
-    ev = 4.0 * p_win - (1.0 - p_win)
+    ev = float(sidebet_ev(np.float64(p_win)))
     assert abs(ev) < 0.001, f"Break-even EV should be ~0: {ev}"
 
-def test_hazard_cdf_usage():
+def test_hazard_cdf_usage(ml_engine):
     """Test hazard CDF-based probability calculation"""
-    from backend.game_aware_ml_engine import GameAwareMLPatternEngine
-    from backend.enhanced_pattern_engine import EnhancedPatternEngine
-    
-    base_engine = EnhancedPatternEngine()
-    ml_engine = GameAwareMLPatternEngine(base_engine)
-    
     # Test signal generation
     signal = ml_engine.side_bet_signal(
         current_tick=50,
@@ -119,7 +123,7 @@ def test_hazard_cdf_usage():
     
     # Check EV calculation
     p_win = signal["p_win_40"]
-    expected_ev = 4.0 * p_win - (1.0 - p_win)
+    expected_ev = float(sidebet_ev(np.float64(p_win)))
     assert abs(signal["expected_value"] - expected_ev) < 0.001, "EV calculation mismatch"
     
     # Check confidence bounds
@@ -131,26 +135,28 @@ def test_coverage_window_calculation():
     
     tracker = IntegratedPatternTracker()
     
-    # Test various tolerance values
-    test_cases = [
-        {"predicted_tick": 100, "tolerance": 20, "current": 80},
-        {"predicted_tick": 150, "tolerance": 40, "current": 100},
-        {"predicted_tick": 200, "tolerance": 60, "current": 150},
-    ]
-    
-    for case in test_cases:
-        pred = {"predicted_tick": case["predicted_tick"], "tolerance": case["tolerance"]}
-        out = tracker._quantize_prediction_tolerance(pred, case["current"])
-        
-        # Check windows calculation
-        width = out["coverage_upper"] - out["coverage_lower"]
-        expected_windows = max(1, (width + (SIDEBET_WINDOW_TICKS - 1)) // SIDEBET_WINDOW_TICKS)
-        assert out["coverage_windows"] == expected_windows, \
-            f"Windows mismatch: got {out['coverage_windows']}, expected {expected_windows}"
+    # Test various tolerance values: rows of [predicted_tick, tolerance]
+    preds = np.array([[100, 20], [150, 40], [200, 60]], dtype=np.int64)
+    currents = np.array([80, 100, 150], dtype=np.int64)
+    
+    out = tracker._quantize_predictions_batch(preds, currents)
+    
+    # Check windows calculation
+    width = out["coverage_upper"] - out["coverage_lower"]
+    expected_windows = np.maximum(1, (width + (SIDEBET_WINDOW_TICKS - 1)) // SIDEBET_WINDOW_TICKS)
+    np.testing.assert_array_equal(out["coverage_windows"], expected_windows)
+    
+    # Batch path must agree with the scalar quantizer
+    for i, (center, tol) in enumerate(preds.tolist()):
+        scalar = tracker._quantize_prediction_tolerance(
+            {"predicted_tick": center, "tolerance": tol}, int(currents[i]))
+        for key in ("tolerance", "coverage_lower", "coverage_upper", "coverage_windows"):
+            assert scalar[key] == out[key][i], \
+                f"{key} mismatch at case {i}: scalar {scalar[key]}, batch {out[key][i]}"
 
 def test_gating_state_management():
     """Test gating state prevents overlapping recommendations"""
-    from backend.server import IntegratedPatternTracker, SIDEBET_WINDOW_TICKS, SIDEBET_COOLDOWN_TICKS
+    from backend.server import IntegratedPatternTracker, SIDEBET_WINDOW_TICKS, NEXT_ELIGIBLE_OFFSET
     
     tracker = IntegratedPatternTracker()
     
@@ -159,20 +165,20 @@ def test_gating_state_management():
     tracker.last_side_bet_tick = first_tick
     tracker.last_side_bet_active_until = first_tick + (SIDEBET_WINDOW_TICKS - 1)
     
-    # Check various ticks
-    test_ticks = [
-        (first_tick + 20, False),  # Still within window
-        (first_tick + 39, False),  # At end of window
-        (first_tick + 40, False),  # Just after window (cooldown starts)
-        (first_tick + 43, False),  # Within cooldown
-        (first_tick + 44, True),   # After cooldown, eligible
-        (first_tick + 50, True),   # Well after cooldown
-    ]
-    
-    for tick, expected_eligible in test_ticks:
-        can_recommend = tick > (tracker.last_side_bet_active_until + SIDEBET_COOLDOWN_TICKS)
-        assert can_recommend == expected_eligible, \
-            f"Tick {tick}: expected eligible={expected_eligible}, got {can_recommend}"
+    # Check various ticks in one vectorized comparison
+    ticks = first_tick + np.array([
+        20,  # Still within window
+        39,  # At end of window
+        40,  # Just after window (cooldown starts)
+        43,  # Within cooldown
+        44,  # After cooldown, eligible
+        50,  # Well after cooldown
+    ])
+    expected = np.array([False, False, False, False, True, True])
+    
+    mask = ticks >= tracker.last_side_bet_tick + NEXT_ELIGIBLE_OFFSET
+    assert np.array_equal(mask, expected), \
+        f"Eligibility mismatch at ticks {ticks[mask != expected].tolist()}: got {mask.tolist()}"
 
 def test_history_retention():
     """Test that history deques maintain proper size"""
@@ -187,9 +193,9 @@ def test_history_retention():
         f"Side bet history size: {tracker.side_bet_history.maxlen}"
     
     # Test overflow behavior
-    for i in range(250):
-        tracker.prediction_history.append({"game_id": i})
-        tracker.side_bet_history.append({"game_id": i})
+    records = [{"game_id": i} for i in range(250)]
+    tracker.prediction_history.extend(records)
+    tracker.side_bet_history.extend(records)
     
     assert len(tracker.prediction_history) == 200
     assert len(tracker.side_bet_history) == 200
@@ -228,48 +234,3 @@ def test_side_bet_record_fields():
     assert record["expected_value"] == 0.25
     assert record["confidence"] == 0.8
     assert "timestamp" in record
-
-def run_all_tests():
-    """Run all test cases and report results"""
-    import traceback
-    
-    print("\n" + "="*60)
-    print("TED-V1 INVARIANT TESTS")
-    print("="*60 + "\n")
-    
-    tests = [
-        test_win_eval_relative_to_placement,
-        test_gating_spacing,
-        test_tolerance_quantization,
-        test_ev_threshold_logic,
-        test_hazard_cdf_usage,
-        test_coverage_window_calculation,
-        test_gating_state_management,
-        test_history_retention,
-        test_side_bet_record_fields,
-    ]
-    
-    passed = 0
-    failed = 0
-    
-    for test in tests:
-        try:
-            test()
-            print(f"✅ {test.__name__}: PASSED")
-            passed += 1
-        except Exception as e:
-            print(f"❌ {test.__name__}: FAILED")
-            print(f"   Error: {e}")
-            if "--verbose" in sys.argv:
-                traceback.print_exc()
-            failed += 1
-    
-    print("\n" + "="*60)
-    print(f"RESULTS: {passed} passed, {failed} failed")
-    print("="*60)
-    
-    return failed == 0
-
-if __name__ == "__main__":
-    success = run_all_tests()
-    sys.exit(0 if success else 1)
\ No newline at end of file
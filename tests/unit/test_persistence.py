@@ -6,18 +6,17 @@ Tests data models, repository operations, and rollback safety.
 import pytest
 import asyncio
 import os
-import sys
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, AsyncMock, patch
-
-# Add backend to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
 
 from backend.models.storage import (
     GameRecord, PredictionRecord, SideBetRecord,
     HourlyMetrics, TickSample, SideBetRecommendation, SideBetOutcome
 )
 from backend.repositories.game_repository import GameRepository
+from backend.persistence_integration import TickSampleBatcher
 
 
 class TestDataModels:
@@ -80,23 +79,48 @@ class TestDataModels:
         payout = bet.calculate_payout(game_end_tick=141)
         assert payout == -1.0
         assert bet.actual_outcome == SideBetOutcome.LOST
+    
+    def test_tick_chunk_missing_features(self):
+        """Test that absent features are stored as None while NaN values round-trip"""
+        import math
+        from backend.models.storage import TickChunk
+        
+        now = datetime.utcnow()
+        samples = [
+            TickSample(game_id="test_123", tick=0, price=1.0, features={"ema10": float("nan")}, timestamp=now),
+            TickSample(game_id="test_123", tick=1, price=1.1, features={}, timestamp=now)
+        ]
+        
+        chunk = TickChunk.from_samples(samples)
+        assert chunk.features["ema10"][1] is None
+        
+        restored = chunk.to_samples()
+        assert math.isnan(restored[0].features["ema10"])
+        assert restored[1].features == {}
+
+
+MOCK_COLLECTIONS = ("games", "predictions", "side_bets", "metrics_hourly", "tick_samples", "tick_chunks")
 
 
 @pytest.mark.asyncio
 class TestGameRepository:
     """Test repository operations"""
     
-    @pytest.fixture
-    async def mock_db(self):
-        """Create mock database"""
+    @pytest.fixture(scope="module")
+    def shared_mock_db(self):
+        """Create the mock database once per module"""
         db = MagicMock()
-        db.games = AsyncMock()
-        db.predictions = AsyncMock()
-        db.side_bets = AsyncMock()
-        db.metrics_hourly = AsyncMock()
-        db.tick_samples = AsyncMock()
+        for name in MOCK_COLLECTIONS:
+            setattr(db, name, AsyncMock())
         return db
     
+    @pytest.fixture
+    def mock_db(self, shared_mock_db):
+        """Shared mock database with calls, return values and side effects cleared"""
+        for name in MOCK_COLLECTIONS:
+            getattr(shared_mock_db, name).reset_mock(return_value=True, side_effect=True)
+        return shared_mock_db
+    
     async def test_persistence_disabled(self, mock_db):
         """Test that operations are no-ops when persistence is disabled"""
         with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "false"}):
@@ -144,34 +168,79 @@ class TestGameRepository:
                 {
                     "_id": "pred1",
                     "game_id": "test_game",
+                    "predicted_at_tick": 50,
                     "predicted_end_tick": 200,
-                    "actual_end_tick": None
+                    "actual_end_tick": None,
+                    "confidence": 0.7
                 },
                 {
                     "_id": "pred2", 
                     "game_id": "test_game",
+                    "predicted_at_tick": 60,
                     "predicted_end_tick": 250,
-                    "actual_end_tick": None
+                    "actual_end_tick": None,
+                    "confidence": 0.6
                 }
             ]
             
-            mock_cursor = AsyncMock()
-            mock_cursor.to_list.return_value = mock_predictions
-            mock_db.predictions.find.return_value = mock_cursor
+            # Motor's find() is synchronous and returns a cursor that is
+            # iterated with async for
+            mock_cursor = MagicMock()
+            mock_cursor.batch_size.return_value = mock_cursor
+            mock_cursor.__aiter__.return_value = mock_predictions
+            mock_db.predictions.find = MagicMock(return_value=mock_cursor)
             
             # Update predictions
             await repo.update_prediction_outcome("test_game", actual_tick=280)
             
-            # Should have updated both predictions
-            assert mock_db.predictions.update_one.call_count == 2
+            # Should have updated both predictions in a single bulk write
+            mock_db.predictions.bulk_write.assert_called_once()
+            operations = mock_db.predictions.bulk_write.call_args[0][0]
+            assert len(operations) == 2
+            mock_db.predictions.update_one.assert_not_called()
             
-            # Check first update call
-            first_call = mock_db.predictions.update_one.call_args_list[0]
-            update_data = first_call[0][1]["$set"]
+            # Check first update operation
+            first_op = operations[0]
+            assert first_op._filter == {"_id": "pred1"}
+            update_data = first_op._doc["$set"]
             assert update_data["actual_end_tick"] == 280
             assert update_data["error_metrics"]["raw_error"] == -80  # 200 - 280
             assert update_data["error_metrics"]["e40"] == -2.0
     
+    async def test_update_prediction_outcome_streams_in_batches(self, mock_db):
+        """Test that large prediction sets are streamed in bounded bulk writes"""
+        with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "true", "PERSISTENCE_BATCH_SIZE": "500"}):
+            repo = GameRepository(mock_db)
+            
+            async def stream_predictions():
+                for i in range(1500):
+                    yield {
+                        "_id": f"pred{i}",
+                        "game_id": "big_game",
+                        "predicted_at_tick": i,
+                        "predicted_end_tick": 200,
+                        "actual_end_tick": None,
+                        "confidence": 0.5
+                    }
+            
+            mock_cursor = MagicMock()
+            mock_cursor.batch_size.return_value = mock_cursor
+            mock_cursor.__aiter__.side_effect = stream_predictions
+            mock_db.predictions.find = MagicMock(return_value=mock_cursor)
+            
+            await repo.update_prediction_outcome("big_game", actual_tick=240)
+            
+            mock_cursor.batch_size.assert_called_once_with(500)
+            calls = mock_db.predictions.bulk_write.call_args_list
+            assert len(calls) == 3
+            assert all(len(c[0][0]) <= 500 for c in calls)
+            assert sum(len(c[0][0]) for c in calls) == 1500
+            
+            # Accuracy is still computed over the full stream
+            mock_db.games.update_one.assert_called_once_with(
+                {"game_id": "big_game"}, {"$set": {"prediction_accuracy": 1.0}}
+            )
+    
     async def test_batch_tick_sample_save(self, mock_db):
         """Test batch saving of tick samples"""
         with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "true"}):
@@ -197,8 +266,7 @@ class TestGameRepository:
             
             # Mock bulk write response
             mock_result = MagicMock()
-            mock_result.upserted_count = 2
-            mock_result.modified_count = 0
+            mock_result.inserted_count = 2
             mock_db.tick_samples.bulk_write.return_value = mock_result
             
             # Save samples
@@ -207,11 +275,120 @@ class TestGameRepository:
             assert count == 2
             mock_db.tick_samples.bulk_write.assert_called_once()
             
-            # Check bulk operations
+            # Check bulk operations: plain inserts, unordered
             operations = mock_db.tick_samples.bulk_write.call_args[0][0]
             assert len(operations) == 2
-            assert operations[0]["update_one"]["filter"]["game_id"] == "game1"
-            assert operations[0]["update_one"]["filter"]["tick"] == 100
+            assert all(isinstance(op, InsertOne) for op in operations)
+            assert operations[0]._doc["game_id"] == "game1"
+            assert operations[0]._doc["tick"] == 100
+            assert mock_db.tick_samples.bulk_write.call_args[1]["ordered"] is False
+    
+    async def test_tick_batcher_coalesces_writes(self, mock_db):
+        """Test that per-tick samples fed one at a time coalesce into a few bulk writes"""
+        with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "true"}):
+            repo = GameRepository(mock_db)
+            mock_db.tick_samples.bulk_write.return_value = MagicMock(inserted_count=500)
+            
+            batcher = TickSampleBatcher(repo, max_batch=500, max_delay_ms=250, columnar=False)
+            for tick in range(1000):
+                await batcher.add(TickSample(
+                    game_id="game2", tick=tick, price=1.0, timestamp=datetime.utcnow()
+                ))
+            await batcher.close()
+            
+            assert mock_db.tick_samples.bulk_write.call_count <= 3
+            written = sum(len(c[0][0]) for c in mock_db.tick_samples.bulk_write.call_args_list)
+            assert written == 1000
+    
+    async def test_batch_tick_sample_save_skips_duplicates(self, mock_db):
+        """Test that re-sent ticks fail on the unique index and are skipped"""
+        with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "true"}):
+            repo = GameRepository(mock_db)
+            samples = [
+                TickSample(game_id="game1", tick=tick, price=1.5, timestamp=datetime.utcnow())
+                for tick in (100, 110)
+            ]
+            
+            mock_db.tick_samples.bulk_write.side_effect = BulkWriteError({
+                "nInserted": 1,
+                "writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}]
+            })
+            assert await repo.save_tick_samples_batch(samples) == 1
+            
+            # Any other write error is still a failure
+            mock_db.tick_samples.bulk_write.side_effect = BulkWriteError({
+                "nInserted": 0,
+                "writeErrors": [{"index": 0, "code": 121, "errmsg": "Document failed validation"}]
+            })
+            assert await repo.save_tick_samples_batch(samples) == 0
+    
+    async def test_tick_chunk_storage(self, mock_db):
+        """Test columnar tick chunks written by the batcher and read back by range"""
+        from backend.models.storage import TickChunk
+        
+        with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "true"}):
+            repo = GameRepository(mock_db)
+            
+            batcher = TickSampleBatcher(repo, max_batch=500, max_delay_ms=250)
+            for tick in range(600):
+                await batcher.add(TickSample(
+                    game_id="game3", tick=tick, price=1.0 + tick / 100,
+                    features={"volatility": 0.1} if tick % 2 else {},
+                    timestamp=datetime.utcnow()
+                ))
+                if tick == 254:
+                    # The game's chunk stays open until it holds 256 ticks
+                    await batcher.flush()
+                    mock_db.tick_chunks.insert_many.assert_not_called()
+            await batcher.end_game("game3")
+            
+            # Full chunks go out together; game end writes the partial tail
+            mock_db.tick_samples.bulk_write.assert_not_called()
+            assert mock_db.tick_chunks.insert_many.call_count == 2
+            chunks = [doc for c in mock_db.tick_chunks.insert_many.call_args_list for doc in c[0][0]]
+            assert [len(doc["ticks"]) for doc in chunks] == [256, 256, 88]
+            assert chunks[0]["start_tick"] == 0 and chunks[0]["end_tick"] == 255
+            
+            # A retried flush only counts the chunks that were not already stored
+            mock_db.tick_chunks.insert_many.side_effect = BulkWriteError({
+                "nInserted": 0,
+                "writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}]
+            })
+            assert await repo.save_tick_chunks(TickChunk(**chunks[2]).to_samples()) == 0
+            mock_db.tick_chunks.insert_many.side_effect = None
+            
+            # Range reads rebuild per-tick samples, dropping features absent at a tick
+            cursor = MagicMock()
+            cursor.sort.return_value = cursor
+            cursor.__aiter__.return_value = chunks[:2]
+            mock_db.tick_chunks.find = MagicMock(return_value=cursor)
+            
+            samples = await repo.get_tick_samples("game3", 250, 260)
+            assert [s.tick for s in samples] == list(range(250, 261))
+            assert samples[0].features == {}
+            assert samples[1].features == {"volatility": 0.1}
+            assert samples[1].price == TickChunk(**chunks[0]).to_samples()[251].price
+    
+    async def test_tick_chunk_closed_on_game_switch(self, mock_db):
+        """Test that a game whose end is never reported does not keep its chunk open"""
+        with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "true"}):
+            repo = GameRepository(mock_db)
+            
+            batcher = TickSampleBatcher(repo, max_batch=500, max_delay_ms=250)
+            for game_id in ("game4", "game5"):
+                for tick in range(10):
+                    await batcher.add(TickSample(
+                        game_id=game_id, tick=tick, price=1.0, timestamp=datetime.utcnow()
+                    ))
+            await batcher.flush()
+            
+            chunks = mock_db.tick_chunks.insert_many.call_args[0][0]
+            assert [(doc["game_id"], len(doc["ticks"])) for doc in chunks] == [("game4", 10)]
+            assert list(batcher._open) == ["game5"]
+            
+            await batcher.close()
+            assert not batcher._open
+            assert mock_db.tick_chunks.insert_many.call_args[0][0][0]["game_id"] == "game5"
     
     async def test_cleanup_old_data(self, mock_db):
         """Test data retention cleanup"""
@@ -232,6 +409,14 @@ class TestGameRepository:
                 "games": 180
             }
             
+            # No TTL indexes; the oldest document of each collection is
+            # within one cleanup chunk of its cutoff
+            now = datetime.utcnow()
+            for name, days in retention_days.items():
+                coll = getattr(mock_db, name)
+                coll.index_information.return_value = {}
+                coll.find_one.return_value = {"created_at": now - timedelta(days=days, hours=12)}
+            
             deleted = await repo.cleanup_old_data(retention_days)
             
             assert deleted["tick_samples"] == 100
@@ -247,6 +432,57 @@ class TestGameRepository:
             expected_cutoff = datetime.utcnow() - timedelta(days=7)
             time_diff = abs((tick_cutoff - expected_cutoff).total_seconds())
             assert time_diff < 60  # Within 1 minute tolerance
+    
+    async def test_cleanup_deletes_in_daily_chunks(self, mock_db):
+        """Test that cleanup walks expired data in chronological one-day deletes"""
+        with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "true"}):
+            repo = GameRepository(mock_db)
+            
+            mock_db.tick_samples.index_information.return_value = {}
+            mock_db.tick_samples.delete_many.return_value = MagicMock(deleted_count=100)
+            mock_db.tick_samples.find_one.return_value = {
+                "created_at": datetime.utcnow() - timedelta(days=9.5)
+            }
+            
+            deleted = await repo.cleanup_old_data({"tick_samples": 7})
+            
+            # 2.5 days past the cutoff -> three deletes, contiguous and in order
+            assert deleted["tick_samples"] == 300
+            ranges = [c[0][0]["created_at"] for c in mock_db.tick_samples.delete_many.call_args_list]
+            assert len(ranges) == 3
+            assert all(prev["$lt"] == cur["$gte"] for prev, cur in zip(ranges, ranges[1:]))
+            assert all(r["$lt"] - r["$gte"] <= timedelta(days=1) for r in ranges)
+    
+    async def test_ttl_indexes_replace_cleanup(self, mock_db):
+        """Test that TTL indexes take over expiry from the Python-side sweep"""
+        with patch.dict(os.environ, {"PERSISTENCE_ENABLED": "true"}):
+            repo = GameRepository(mock_db)
+            retention_days = {"tick_samples": 7, "games": 180}
+            
+            now = datetime.utcnow()
+            for name, days in retention_days.items():
+                coll = getattr(mock_db, name)
+                coll.index_information.return_value = {}
+                coll.find_one.return_value = {"created_at": now - timedelta(days=days, hours=12)}
+                coll.delete_many.return_value = MagicMock(deleted_count=10)
+            
+            configured = await repo.ensure_ttl_indexes(retention_days)
+            
+            assert configured["tick_samples"] == 7 * 86400
+            _, kwargs = mock_db.tick_samples.create_index.call_args
+            assert kwargs["expireAfterSeconds"] == 7 * 86400
+            _, kwargs = mock_db.games.create_index.call_args
+            assert kwargs["expireAfterSeconds"] == 180 * 86400
+            
+            # Cleanup becomes a no-op for collections expired by TTL
+            mock_db.tick_samples.index_information.return_value = {
+                "created_at_ttl": {"key": [("created_at", 1)], "expireAfterSeconds": 7 * 86400}
+            }
+            deleted = await repo.cleanup_old_data(retention_days)
+            
+            assert "tick_samples" not in deleted
+            assert deleted["games"] == 10
+            mock_db.tick_samples.delete_many.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -286,6 +522,122 @@ class TestPersistenceIntegration:
             
             status = integration.get_status()
             assert status["enabled"] is True
+    
+    async def test_game_end_single_bulk_write_per_collection(self):
+        """Test that game finalization issues one bulk_write per collection"""
+        from backend.persistence_integration import PersistenceIntegration
+        
+        mock_db = MagicMock()
+        for name in MOCK_COLLECTIONS:
+            setattr(mock_db, name, AsyncMock())
+        integration = PersistenceIntegration(mock_db, enabled=True)
+        
+        mock_db.games.find_one.return_value = {"game_id": "game1", "start_tick": 0}
+        predictions = [
+            {"_id": f"pred{i}", "game_id": "game1", "predicted_at_tick": 10 * i,
+             "predicted_end_tick": 200 + i, "actual_end_tick": None, "confidence": 0.5}
+            for i in range(25)
+        ]
+        side_bets = [
+            {"_id": f"bet{i}", "game_id": "game1", "placed_at_tick": 40 * i,
+             "window_end_tick": 40 * i + 40, "probability": 0.3, "expected_value": 0.5,
+             "confidence": 0.6, "recommendation": "BET"}
+            for i in range(8)
+        ]
+        prediction_cursor = MagicMock()
+        prediction_cursor.batch_size.return_value = prediction_cursor
+        prediction_cursor.__aiter__.return_value = predictions
+        mock_db.predictions.find = MagicMock(return_value=prediction_cursor)
+        side_bet_cursor = AsyncMock()
+        side_bet_cursor.to_list.return_value = side_bets
+        mock_db.side_bets.find = MagicMock(return_value=side_bet_cursor)
+        
+        await integration.on_game_end("game1", 280, 5.0)
+        
+        for coll, expected_ops in ((mock_db.games, 2), (mock_db.predictions, 25), (mock_db.side_bets, 8)):
+            coll.bulk_write.assert_called_once()
+            assert len(coll.bulk_write.call_args[0][0]) == expected_ops
+            coll.update_one.assert_not_called()
+        
+        # Long games are paged: predictions are read and committed a batch at a time
+        for coll in (mock_db.games, mock_db.predictions, mock_db.side_bets):
+            coll.bulk_write.reset_mock()
+        integration.repo.batch_size = 10
+        await integration.on_game_end("game1", 280, 5.0)
+        
+        prediction_cursor.batch_size.assert_called_with(10)
+        prediction_writes = [len(c[0][0]) for c in mock_db.predictions.bulk_write.call_args_list]
+        assert prediction_writes == [10, 10, 5]
+        assert mock_db.games.bulk_write.call_args[0][0][-1]._doc["$set"]["prediction_accuracy"] == 1.0
+    
+    async def test_tick_sampling_cadence(self):
+        """Test that only every PERSISTENCE_TICK_SAMPLE_EVERY-th tick is buffered"""
+        from backend.persistence_integration import PersistenceIntegration
+        
+        with patch.dict(os.environ, {"PERSISTENCE_TICK_SAMPLE_EVERY": "10"}):
+            integration = PersistenceIntegration(MagicMock(), enabled=True)
+        integration.tick_batcher = AsyncMock()
+        
+        for tick in range(35):
+            await integration.on_tick("game1", tick, 1.0)
+        
+        assert [c[0][0].tick for c in integration.tick_batcher.add.call_args_list] == [0, 10, 20, 30]
+    
+    async def test_game_end_record_building_off_event_loop(self):
+        """Test that slow record building at game end does not stall tick handling"""
+        import time
+        from backend.persistence_integration import PersistenceIntegration
+        from backend.repositories.game_repository import UnitOfWork
+        
+        mock_db = MagicMock()
+        for name in MOCK_COLLECTIONS:
+            setattr(mock_db, name, AsyncMock())
+        integration = PersistenceIntegration(mock_db, enabled=True)
+        
+        mock_db.games.find_one.return_value = None
+        prediction_cursor = MagicMock()
+        prediction_cursor.batch_size.return_value = prediction_cursor
+        prediction_cursor.__aiter__.return_value = []
+        mock_db.predictions.find = MagicMock(return_value=prediction_cursor)
+        side_bet_cursor = AsyncMock()
+        side_bet_cursor.to_list.return_value = []
+        mock_db.side_bets.find = MagicMock(return_value=side_bet_cursor)
+        
+        def slow_build(*args):
+            time.sleep(0.05)
+            return UnitOfWork(integration.repo)
+        
+        ticks_handled = 0
+        
+        async def feed_ticks():
+            nonlocal ticks_handled
+            while not game_end.done():
+                await integration.on_tick("game1", ticks_handled, 1.0)
+                ticks_handled += 1
+                await asyncio.sleep(0.005)
+        
+        with patch.object(integration, "_build_records", side_effect=slow_build):
+            game_end = asyncio.ensure_future(integration.on_game_end("game1", 280, 5.0))
+            await asyncio.gather(game_end, feed_ticks())
+        await integration.stop()
+        
+        # A blocking build would have let at most one tick through
+        assert ticks_handled >= 3
+    
+    async def test_shared_client_is_pooled_singleton(self):
+        """Test that get_client builds one pooled Motor client per process"""
+        import backend.persistence_integration as integration_module
+        
+        with patch.object(integration_module, "_client", None), \
+             patch.object(integration_module, "AsyncIOMotorClient") as client_cls:
+            first = integration_module.get_client("mongodb://localhost:27017")
+            second = integration_module.get_client()
+        
+        assert first is second
+        client_cls.assert_called_once()
+        _, kwargs = client_cls.call_args
+        assert kwargs["maxPoolSize"] >= 2
+        assert kwargs["minPoolSize"] <= kwargs["maxPoolSize"]
 
 
 if __name__ == "__main__":
@@ -1,6 +1,4 @@
 import os
-import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Set environment variables for testing
 os.environ["SIDEBET_WINDOW_TICKS"] = "40"
@@ -21,17 +19,16 @@ def test_win_eval_relative_to_placement():
     
     # Should win since 45 <= 6 + 40 (46)
     assert cg.final_tick <= placed_at + window, f"Expected win: {cg.final_tick} <= {placed_at + window}"
-    print("✅ Win evaluation relative to placement: PASSED")
 
 def test_gating_spacing():
     """Test that gating enforces proper spacing between recommendations"""
     placed = 100
     window, cooldown = 40, 4
-    next_eligible = placed + window - 1 + cooldown + 1
+    # Coverage ends at placed + window - 1; eligible again after the cooldown
+    next_eligible = placed + window + cooldown
     
     # Next eligible should be 100 + 39 + 4 + 1 = 144
     assert next_eligible == 144, f"Expected 144, got {next_eligible}"
-    print("✅ Gating spacing calculation: PASSED")
 
 def test_tolerance_quantization():
     """Test that tolerance is quantized to 40-tick windows"""
@@ -50,8 +47,6 @@ def test_tolerance_quantization():
     # Width should be multiple of 40 (or 0)
     width = out["coverage_upper"] - out["coverage_lower"]
     assert width % 40 == 0 or width == 0, f"Width not aligned to windows: {width}"
-    
-    print("✅ Tolerance quantization: PASSED")
 
 def test_hazard_side_bet_signal():
     """Test the new hazard-based side bet signal"""
@@ -82,63 +77,23 @@ def test_hazard_side_bet_signal():
     p_win = signal["p_win_40"]
     expected_ev = 4.0 * p_win - (1.0 - p_win)
     assert abs(signal["expected_value"] - expected_ev) < 0.001, "EV calculation mismatch"
-    
-    print("✅ Hazard side bet signal: PASSED")
 
 def test_ev_threshold():
     """Test that EV threshold correctly triggers recommendations"""
+    import numpy as np
+    from backend.game_aware_ml_engine import side_bet_ev_vec
+    
     threshold = 0.20
     
-    # Test case 1: p_win = 0.21 should trigger
-    p_win = 0.21
-    ev = 4.0 * p_win - (1.0 - p_win)
-    assert p_win > threshold, f"Should trigger: {p_win} > {threshold}"
-    assert ev > 0, f"EV should be positive: {ev}"
+    # Sweep p_win over [0, 1]; EV = 4*p - (1-p) = 5*p - 1
+    p_win = np.linspace(0.0, 1.0, 1001)
+    ev = side_bet_ev_vec(p_win)
+    assert np.allclose(ev, 4.0 * p_win - (1.0 - p_win)), "Vectorized EV mismatch"
     
-    # Test case 2: p_win = 0.19 should not trigger  
-    p_win = 0.19
-    ev = 4.0 * p_win - (1.0 - p_win)
-    assert p_win <= threshold, f"Should not trigger: {p_win} <= {threshold}"
+    # Positive EV exactly when p_win clears the threshold
+    mask = np.abs(p_win - threshold) > 1e-9
+    assert np.all((p_win[mask] > threshold) == (ev[mask] > 0)), "EV sign disagrees with threshold"
     
     # Break-even point: p_win = 0.20 => EV = 0
-    p_win = 0.20
-    ev = 4.0 * p_win - (1.0 - p_win)
-    assert abs(ev) < 0.001, f"Break-even EV should be ~0: {ev}"
-    
-    print("✅ EV threshold logic: PASSED")
-
-def run_all_tests():
-    """Run all test cases"""
-    print("\n" + "="*60)
-    print("SIDE BET PATCH VALIDATION TESTS")
-    print("="*60 + "\n")
-    
-    tests = [
-        test_win_eval_relative_to_placement,
-        test_gating_spacing,
-        test_tolerance_quantization,
-        test_hazard_side_bet_signal,
-        test_ev_threshold
-    ]
-    
-    passed = 0
-    failed = 0
-    
-    for test in tests:
-        try:
-            test()
-            passed += 1
-        except Exception as e:
-            print(f"❌ {test.__name__}: FAILED")
-            print(f"   Error: {e}")
-            failed += 1
-    
-    print("\n" + "="*60)
-    print(f"RESULTS: {passed} passed, {failed} failed")
-    print("="*60)
-    
-    return failed == 0
-
-if __name__ == "__main__":
-    success = run_all_tests()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    ev_break_even = ev[np.argmin(np.abs(p_win - threshold))]
+    assert abs(ev_break_even) < 1e-9, f"Break-even EV should be ~0: {ev_break_even}"
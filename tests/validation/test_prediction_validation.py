@@ -6,8 +6,16 @@ Tests specific prediction logic requirements from review request
 
 import requests
 import json
+import re
 import sys
 
+# ML status fields every /api/patterns response must carry
+REQUIRED_ML_STATUS_FIELDS = frozenset({'ml_enabled', 'prediction_method'})
+
+# Modules the prediction_method string must mention (single-pass scan)
+REQUIRED_METHOD_TOKENS = frozenset({'hazard', 'conformal', 'gate'})
+METHOD_TOKEN_RE = re.compile('|'.join(sorted(REQUIRED_METHOD_TOKENS)))
+
 class PredictionValidationTester:
     def __init__(self, base_url="https://pattern-prophet-2.preview.emergentagent.com"):
         self.base_url = base_url
@@ -81,15 +89,14 @@ class PredictionValidationTester:
                 return self.log_test("ML Status Structure", False, "No ml_status object")
             
             # Check for expected fields
-            required_fields = ['ml_enabled', 'prediction_method']
-            missing_fields = [f for f in required_fields if f not in ml_status]
+            missing_fields = sorted(REQUIRED_ML_STATUS_FIELDS.difference(ml_status))
             
             if missing_fields:
                 return self.log_test("ML Status Structure", False, f"Missing fields: {missing_fields}")
             
             # Check prediction method indicates new integration
             pred_method = ml_status.get('prediction_method', '')
-            if 'hazard' not in pred_method or 'conformal' not in pred_method or 'gate' not in pred_method:
+            if not REQUIRED_METHOD_TOKENS.issubset(METHOD_TOKEN_RE.findall(pred_method)):
                 return self.log_test("ML Status Structure", False, f"prediction_method doesn't indicate new modules: {pred_method}")
             
             # Check modules section if present